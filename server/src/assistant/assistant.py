@@ -10,6 +10,7 @@ Logique métier de l'assistant mathématique (indépendante de l'UI).
 """
 from __future__ import annotations
 from typing import Optional, List, Dict, Any, Tuple
+from functools import cache, lru_cache
 import uuid, time, json, os
 from rapidfuzz import fuzz
 
@@ -54,8 +55,26 @@ def _now_ms() -> int:
     return int(time.time() * 1000)
 
 
+def _perf_ms() -> int:
+    """Horloge monotone (ms) pour mesurer les latences, insensible aux sauts NTP."""
+    return time.perf_counter_ns() // 1_000_000
+
+
 # --- Query Rewriter ---------------------------------------------------------
 
+@lru_cache(maxsize=512, typed=True)
+def _describe_meta_cached(chapter: Any, block_kind: Any, block_id: Any, typ: Any) -> str:
+    """Description du contexte épinglé (mêmes scopes d'un tour à l'autre)."""
+    parts = []
+    if chapter: parts.append(f"chapitre {chapter}")
+    if block_kind and block_id:
+        parts.append(f"{block_kind} {block_id}")
+    elif block_kind:
+        parts.append(str(block_kind))
+    if typ: parts.append(f"type={typ}")
+    return ", ".join(parts) if parts else "(aucun)"
+
+
 class QueryRewriter:
     REWRITE_PROMPT = ChatPromptTemplate.from_template(
         """Tu reformules des questions courtes d'étudiants en requêtes auto-suffisantes pour la recherche de contexte.
@@ -82,29 +101,28 @@ Consigne:
         self.enabled = rag_config.enable_rewrite
         self.model_name = rag_config.rewrite_model or rag_config.llm_model
         self.model = None
+        self._chain = None  # prompt | modèle, composé une seule fois
         if self.enabled:
             try:
                 ensure_model(rag_config.ollama_host, self.model_name, rag_config.ollama_api_key)
                 self.model = _make_llm(self.model_name)
+                self._chain = self.REWRITE_PROMPT | self.model
             except SystemExit:
                 self.enabled = False
                 self.model = None
+                self._chain = None
             except Exception:
                 self.enabled = False
                 self.model = None
+                self._chain = None
 
     @staticmethod
     def describe_meta(meta: Optional[Dict[str, Any]]) -> str:
         if not meta:
             return "(aucun)"
-        parts = []
-        if meta.get("chapter"): parts.append(f"chapitre {meta['chapter']}")
-        if meta.get("block_kind") and meta.get("block_id"):
-            parts.append(f"{meta['block_kind']} {meta['block_id']}")
-        elif meta.get("block_kind"):
-            parts.append(str(meta["block_kind"]))
-        if meta.get("type"): parts.append(f"type={meta['type']}")
-        return ", ".join(parts) if parts else "(aucun)"
+        return _describe_meta_cached(
+            meta.get("chapter"), meta.get("block_kind"), meta.get("block_id"), meta.get("type")
+        )
 
     def rewrite(
         self,
@@ -114,7 +132,7 @@ Consigne:
         is_followup: bool,
         dbg: Optional[Dict[str, Any]] = None
     ) -> str:
-        if not self.enabled or self.model is None:
+        if not self.enabled or self._chain is None:
             if dbg is not None:
                 dbg["rewriter"] = {"enabled": False, "model": None, "output": new_q}
             return new_q
@@ -124,10 +142,9 @@ Consigne:
             return new_q
         try:
             ctx_str = self.describe_meta(context_meta)
-            chain = self.REWRITE_PROMPT | self.model
-            t0 = _now_ms()
-            out = chain.invoke({"last_q": last_q or "(aucune)", "new_q": new_q, "ctx": ctx_str})
-            dt = _now_ms() - t0
+            t0 = _perf_ms()
+            out = self._chain.invoke({"last_q": last_q or "(aucune)", "new_q": new_q, "ctx": ctx_str})
+            dt = _perf_ms() - t0
             rew = (out or "").strip() or new_q
             if dbg is not None:
                 # on essaie d’obtenir un aperçu du prompt (optionnel)
@@ -384,11 +401,11 @@ class MathAssistant:
 
         # primary
         model_used = getattr(self.llm_primary, "model", "primary")
-        t0 = _now_ms()
+        t0 = _perf_ms()
         try:
             chain = (prompt_tpl | self.llm_primary)
             out = chain.invoke(vars)
-            dt = _now_ms() - t0
+            dt = _perf_ms() - t0
             if dbg is not None:
                 dbg.setdefault("llm_calls", []).append({
                     "step": step,
@@ -412,11 +429,11 @@ class MathAssistant:
                     })
                 raise
             # fallback
-            t1 = _now_ms()
+            t1 = _perf_ms()
             try:
                 chain_fb = (prompt_tpl | self.llm_fallback)
                 out_fb = chain_fb.invoke(vars)
-                dt_fb = _now_ms() - t1
+                dt_fb = _perf_ms() - t1
                 if dbg is not None:
                     dbg.setdefault("llm_calls", []).append({
                         "step": step,
@@ -796,9 +813,9 @@ class MathAssistant:
         # Normaliser LaTeX → Unicode pour meilleur retrieval
         hinted_q_normalized = normalize_query_for_retrieval(hinted_q)
 
-        t0 = _now_ms()
+        t0 = _perf_ms()
         docs = retriever.invoke(hinted_q_normalized)
-        tR = _now_ms() - t0
+        tR = _perf_ms() - t0
 
         # évaluer la qualité du contexte
         sim_max = 0.0
@@ -920,9 +937,9 @@ class MathAssistant:
         # Normaliser LaTeX → Unicode pour meilleur retrieval
         query_normalized = normalize_query_for_retrieval(rewritten or question)
         
-        t0 = _now_ms()
+        t0 = _perf_ms()
         docs = retriever.invoke(query_normalized)
-        tR = _now_ms() - t0
+        tR = _perf_ms() - t0
 
         if dbg is not None:
             dbg["retrieval"] = {
@@ -1019,14 +1036,10 @@ class MathAssistant:
 
 # -- Instance globale et helpers module-level --
 
-_assistant: Optional[MathAssistant] = None
-
+@cache
 def get_assistant() -> MathAssistant:
-    """Singleton de l'assistant."""
-    global _assistant
-    if _assistant is None:
-        _assistant = MathAssistant()
-    return _assistant
+    """Singleton de l'assistant (réinitialisable via get_assistant.cache_clear())."""
+    return MathAssistant()
 
 def run_task(task: str, question_or_payload: str, **kwargs):
     return get_assistant().run_task(task, question_or_payload, **kwargs)
@@ -10,33 +10,31 @@ Routeur décisionnel pour l'assistant Maths (IA → IA).
 """
 from __future__ import annotations
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional, Dict, Any, List, Tuple
-import uuid, re, time, unicodedata
+import uuid, re, time
 from rapidfuzz import fuzz
 
 from langchain_core.documents import Document
 
 from ..core.rag_engine import get_engine
 from ..core.config import rag_config
-from src.utils import normalize_whitespace, normalize_query_for_retrieval
+from src.utils import normalize_whitespace, normalize_query_for_retrieval, strip_accents
 
 # -------------------------
 # Helpers
 # -------------------------
-def _strip_accents(s: str) -> str:
-    return unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
-
 def _norm(s: str) -> str:
-    s = _strip_accents(s or "")
+    s = strip_accents(s or "")
     s = s.lower()
     return " ".join(s.split())
 
 def _clamp(x: float, lo: float = 0.0, hi: float = 1.0) -> float:
     return max(lo, min(hi, x))
 
-def _regex_hit(patterns: Tuple[str, ...], s: str) -> bool:
-    """Vrai si au moins un pattern regex matche la chaîne normalisée."""
-    return any(re.search(p, s) for p in patterns)
+def _any_of(patterns: Tuple[str, ...]) -> re.Pattern:
+    """Compile une liste de patterns en une seule alternation (test « au moins un »)."""
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
 
 # -------------------------
 # Regex/keywords (ASCII, car normalisé)
@@ -196,6 +194,21 @@ INTENT_PATTERNS: List[Tuple[str, Tuple[str, ...]]] = [
     ("qa", (r".*",)),
 ]
 
+# Versions compilées une fois à l'import (entrée déjà normalisée : ASCII,
+# minuscules, une seule ligne)
+_OUT_OF_SYLLABUS_RE = _any_of(OUT_OF_SYLLABUS_KW)
+_BOOK_RE = _any_of(BOOK_KW)
+_MATH_RE = _any_of(MATH_KW)
+_BOOK_EXO_RE = re.compile(r"\b(exo|exercice|exercices|exos)\b")
+_BOOK_DEMO_RE = re.compile(r"\b(preuve|demonstration)\b")
+
+# (task, patterns compilés, cibles fuzzy) ; chaque pattern touché compte 1
+_INTENT_RULES = [
+    (task, tuple(re.compile(p) for p in pats), tuple(p.replace("\\b", "") for p in pats))
+    for task, pats in INTENT_PATTERNS
+]
+_INTENT_RANK = {task: i for i, (task, _) in enumerate(INTENT_PATTERNS)}
+
 # -------------------------
 # Dataclass
 # -------------------------
@@ -211,30 +224,33 @@ class RouterDecision:
 # -------------------------
 # Intent helpers
 # -------------------------
+# Fonctions pures de la question normalisée : mémoïsées (questions reformulées,
+# relances). Le dict de scores renvoyé est partagé : ne pas le modifier.
+@lru_cache(maxsize=4096)
 def _intent_from_text(q_norm: str) -> Tuple[str, Dict[str, float]]:
     """Score chaque intent; retourne (best_task, scores)."""
     scores: Dict[str, float] = {}
-    order = [t for t, _ in INTENT_PATTERNS]
-    for task, pats in INTENT_PATTERNS:
-        raw = sum(1.0 for p in pats if re.search(p, q_norm))
+    for task, pats, targets in _INTENT_RULES:
+        raw = sum(1.0 for p in pats if p.search(q_norm))
         if raw == 0 and task != "qa":
             try:
-                sim = max(fuzz.partial_ratio(q_norm, p.replace("\\b", "")) for p in pats) / 100.0
+                sim = max(fuzz.partial_ratio(q_norm, t) for t in targets) / 100.0
             except ValueError:
                 sim = 0.0
         else:
             sim = 0.0
         scores[task] = raw + 0.5 * sim
-    best = max(scores.items(), key=lambda kv: (kv[1], -order.index(kv[0])))[0]
+    best = max(scores.items(), key=lambda kv: (kv[1], -_INTENT_RANK[kv[0]]))[0]
     return best, scores
 
+@lru_cache(maxsize=4096)
 def _book_intent(q_norm: str) -> Optional[str]:
     """Intent spécial livre/hors-programme."""
-    has_book = _regex_hit(BOOK_KW, q_norm)
-    has_out  = _regex_hit(OUT_OF_SYLLABUS_KW, q_norm)
-    if has_book and re.search(r"\b(exo|exercice|exercices|exos)\b", q_norm):
+    has_book = _BOOK_RE.search(q_norm) is not None
+    has_out  = _OUT_OF_SYLLABUS_RE.search(q_norm) is not None
+    if has_book and _BOOK_EXO_RE.search(q_norm):
         return "book_exercises"
-    if has_out and re.search(r"\b(preuve|demonstration)\b", q_norm):
+    if has_out and _BOOK_DEMO_RE.search(q_norm):
         return "book_demo"
     if has_book or has_out:
         return "course_extension"
@@ -256,7 +272,7 @@ def _quick_rag_signal(query: str, filters: Dict[str, Any]) -> Tuple[float, float
     # Normaliser LaTeX → Unicode pour meilleur retrieval
     query_normalized = normalize_query_for_retrieval(query)
 
-    t0 = time.time()
+    t0 = time.perf_counter()
     try:
         # robustesse inter-versions: tenter top_k puis k
         try:
@@ -265,7 +281,7 @@ def _quick_rag_signal(query: str, filters: Dict[str, Any]) -> Tuple[float, float
             retr = engine.create_retriever(k=k, **filters)
         docs = retr.invoke(query_normalized)
     except Exception as e:
-        dt = int((time.time() - t0) * 1000)
+        dt = int((time.perf_counter() - t0) * 1000)
         return 0.0, 0.0, [], {
             "k": k, "hits": 0, "sim_max": 0.0, "struct_hits": 0,
             "latency_ms": dt, "error": str(e),
@@ -274,7 +290,7 @@ def _quick_rag_signal(query: str, filters: Dict[str, Any]) -> Tuple[float, float
             "use_bm25_with_vector": bool(getattr(engine.config, "use_bm25_with_vector", False)),
         }
 
-    dt = int((time.time() - t0) * 1000)
+    dt = int((time.perf_counter() - t0) * 1000)
     if not docs:
         return 0.0, 0.0, [], {
             "k": k, "hits": 0, "sim_max": 0.0, "struct_hits": 0,
@@ -312,8 +328,9 @@ def _quick_rag_signal(query: str, filters: Dict[str, Any]) -> Tuple[float, float
     }
     return sim_max, struct_bonus, docs, stats
 
+@lru_cache(maxsize=4096)
 def _looks_like_math(q_norm: str) -> bool:
-    return _regex_hit(MATH_KW, q_norm)
+    return _MATH_RE.search(q_norm) is not None
 
 def _threshold(name: str, default: float) -> float:
     return float(getattr(rag_config, name, default))
@@ -8,8 +8,9 @@ from __future__ import annotations
 import re
 from typing import List, Optional, Dict, Any, Tuple
 from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import os
-import unicodedata
 
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -18,7 +19,7 @@ from langchain_ollama.embeddings import OllamaEmbeddings
 from langchain_community.retrievers import BM25Retriever
 
 from .config import rag_config
-from src.utils import clean_text, normalize_whitespace, truncate_text
+from src.utils import clean_text, normalize_whitespace, truncate_text, strip_accents
 
 try:
     from rich.console import Console
@@ -39,8 +40,7 @@ except Exception:
 def _norm(s: Any) -> str:
     """Normalise accents/casse/espaces pour comparer des métadonnées ou filtres."""
     s = "" if s is None else str(s)
-    s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
-    return " ".join(s.strip().lower().split())
+    return " ".join(strip_accents(s).strip().lower().split())
 
 
 # ---------------------------------------------------------------------------
@@ -345,6 +345,39 @@ def _map_reranker_name(name: str) -> str:
     return n
 
 
+@lru_cache(maxsize=4)
+def _load_cross_encoder(hf_id: str, device: Optional[str], int8: bool = False):
+    """
+    Charge le CrossEncoder une seule fois par processus : un retriever est créé
+    à chaque question, les poids sont partagés entre eux (échecs non mémorisés).
+    int8: quantification dynamique des couches Linear (CPU uniquement).
+    """
+    from sentence_transformers import CrossEncoder  # noqa
+    cross = CrossEncoder(hf_id, device=device)
+    if int8:
+        try:
+            import torch
+            # Device effectif : sans device explicite, CUDA est choisi s'il est disponible
+            if next(cross.model.parameters()).device.type == "cpu":
+                cross.model = torch.ao.quantization.quantize_dynamic(
+                    cross.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+        except Exception:
+            pass  # on garde le modèle FP32
+    return cross
+
+
+# Pool partagé : recherche vectorielle (embedding Ollama = I/O) en parallèle de BM25
+_RETRIEVAL_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+
+# Index BM25 par (filtres, k) du dernier corpus vu : un retriever est créé à chaque
+# question, l'index (désaccentuation + tokenisation du corpus) n'est construit qu'une
+# fois ; un nouveau corpus (réindexation) vide le cache, un seul corpus reste retenu
+_BM25_CACHE: Dict[Tuple[Any, ...], Optional[BM25Retriever]] = {}
+_BM25_CACHE_MAX = 32
+_bm25_corpus: Optional[List[Document]] = None
+
+
 class HybridRetriever:
     """Retriever hybride BM25 + Vectoriel avec reranking"""
 
@@ -364,11 +397,10 @@ class HybridRetriever:
 
         # ------------------------- BM25 (optionnel) -------------------------
         bm25_needed = (self.store is None) or bool(getattr(rag_config, "use_bm25_with_vector", False))
+        self.bm25 = None
         if bm25_needed and self.all_docs:
-            bm_docs_source = self._apply_filters(self.all_docs)
-            bm_docs_norm = [Document(page_content=strip_accents(d.page_content), metadata=d.metadata) for d in bm_docs_source]
-            self._bm25_enabled = len(bm_docs_norm) > 0
-            self.bm25 = BM25Retriever.from_documents(bm_docs_norm, k=self.k * 2) if self._bm25_enabled else None
+            self.bm25 = self._bm25_index()
+            self._bm25_enabled = self.bm25 is not None
 
         # ------------------------- Vector (Chroma) --------------------------
         # ------------------------- Vector (Chroma) - FILTRE SOUPLE --------------------------
@@ -408,12 +440,12 @@ class HybridRetriever:
 
     def _init_reranker(self):
         try:
-            from sentence_transformers import CrossEncoder  # noqa
             hf_id = _map_reranker_name(rag_config.reranker_model)
 
             # Device/batch/seq_len contrôlables par env pour s'adapter au PC
             device = os.getenv("RERANKER_DEVICE", None)      # "cpu" | "cuda" | "mps" | None
-            self._cross = CrossEncoder(hf_id, device=device)
+            int8 = os.getenv("RERANK_INT8", "0") == "1"      # opt-in : quantification int8 sur CPU
+            self._cross = _load_cross_encoder(hf_id, device, int8)
 
             self._rr_maxlen = int(os.getenv("RERANK_MAX_LEN", "256"))
             self._rr_batch  = int(os.getenv("RERANK_BATCH", "16"))
@@ -421,6 +453,26 @@ class HybridRetriever:
             self._cross = None
             self.use_reranker = False
 
+    def _bm25_index(self) -> Optional[BM25Retriever]:
+        """Index BM25 du corpus filtré, partagé entre retrievers de même (corpus, filtres, k)."""
+        global _bm25_corpus
+        if _bm25_corpus is not self.all_docs:
+            _BM25_CACHE.clear()
+            _bm25_corpus = self.all_docs
+
+        key = (tuple(sorted((k, _norm(v)) for k, v in self.filters.items() if v is not None)), self.k)
+        if key in _BM25_CACHE:
+            return _BM25_CACHE[key]
+
+        bm_docs_source = self._apply_filters(self.all_docs)
+        bm_docs_norm = [Document(page_content=strip_accents(d.page_content), metadata=d.metadata) for d in bm_docs_source]
+        bm25 = BM25Retriever.from_documents(bm_docs_norm, k=self.k * 2) if bm_docs_norm else None
+
+        if len(_BM25_CACHE) >= _BM25_CACHE_MAX:
+            _BM25_CACHE.pop(next(iter(_BM25_CACHE)), None)
+        _BM25_CACHE[key] = bm25
+        return bm25
+
     def _apply_filters(self, docs: List[Document]) -> List[Document]:
         if not self.filters:
             return docs
@@ -462,8 +514,13 @@ class HybridRetriever:
 
     def invoke(self, query: str) -> List[Document]:
         fast = self._fast_path_docs() if self.all_docs else []
-        bm_docs = self.bm25.invoke(query) if self.bm25 else []
-        vec_docs = self.vector.invoke(query) if self.vector else []
+        if self.bm25 and self.vector:
+            vec_future = _RETRIEVAL_POOL.submit(self.vector.invoke, query)
+            bm_docs = self.bm25.invoke(query)
+            vec_docs = vec_future.result()
+        else:
+            bm_docs = self.bm25.invoke(query) if self.bm25 else []
+            vec_docs = self.vector.invoke(query) if self.vector else []
 
         # Fusion
         rank = defaultdict(float)
@@ -489,10 +546,8 @@ class HybridRetriever:
                 def _approx_clip(s, ntok):  # ~4 chars/token
                     return s[: ntok * 4]
                 pairs = [(query, _approx_clip(d.page_content, self._rr_maxlen)) for d in candidates]
-                scores = []
-                for i in range(0, len(pairs), self._rr_batch):
-                    sub = pairs[i:i + self._rr_batch]
-                    scores.extend(self._cross.predict(sub, show_progress_bar=False))
+                # Un seul appel : le CrossEncoder découpe lui-même en lots
+                scores = self._cross.predict(pairs, batch_size=self._rr_batch, show_progress_bar=False)
                 candidates = [d for d, s in sorted(zip(candidates, scores), key=lambda x: x[1], reverse=True)]
             except Exception:
                 pass
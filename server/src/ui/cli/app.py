@@ -15,6 +15,22 @@ from src.core.config import ui_config, rag_config
 from .styles import console, CLIFormatter
 
 
+# Mode d'argument des commandes (table de dispatch de MathCLI)
+_ARG_NONE = 0       # commande seule (ex: /pin)
+_ARG_REQUIRED = 1   # argument obligatoire (ex: /qcm <notion>)
+_ARG_OPTIONAL = 2   # argument facultatif (ex: /scope [show|clear|set ...])
+
+# Filtres rapides de handle_question: préfixe → type de document (None = tous)
+_QUICK_FILTERS = {
+    "/exercice": "exercice",
+    "/méthode": "méthode",
+    "/methode": "méthode",
+    "/théorie": "théorie",
+    "/theorie": "théorie",
+    "/cours": None,
+}
+
+
 class MathCLI:
     """Interface CLI pour l'assistant mathématique"""
 
@@ -38,6 +54,53 @@ class MathCLI:
         self._last_passport: Optional[dict] = None
         self._last_debug: Optional[dict] = None
 
+        # Table de dispatch: commande → (handler, mode d'argument)
+        self._dispatch = {
+            "/blocks": (self._cmd_blocks, _ARG_OPTIONAL),
+            "/find-bloc": (self._cmd_find_bloc, _ARG_REQUIRED),
+            "/debug": (self._cmd_debug, _ARG_OPTIONAL),
+            "/link": (self._cmd_link, _ARG_OPTIONAL),
+            "/oot": (self._cmd_oot, _ARG_OPTIONAL),
+            "/router": (self._cmd_router, _ARG_OPTIONAL),
+            "/route": (self._cmd_router, _ARG_OPTIONAL),
+            "/backend": (self._cmd_backend, _ARG_OPTIONAL),
+            "/runtime": (self._cmd_backend, _ARG_OPTIONAL),
+            "/passport": (self._cmd_passport, _ARG_OPTIONAL),
+            "/decision": (self._cmd_passport, _ARG_NONE),
+            "/models": (self._cmd_models, _ARG_NONE),
+            "/model": (self._cmd_models, _ARG_NONE),
+            "/where": (self._cmd_where, _ARG_NONE),
+            "/paths": (self._cmd_where, _ARG_NONE),
+            "/pin": (self._cmd_pin, _ARG_NONE),
+            "/unpin": (self._cmd_unpin, _ARG_NONE),
+            "/forget": (self._cmd_forget, _ARG_NONE),
+            "/new-chat": (self._cmd_new_chat, _ARG_NONE),
+            "/qcm": (self._cmd_qcm, _ARG_REQUIRED),
+            "/exam": (self._cmd_exam, _ARG_REQUIRED),
+            "/fiche": (self._cmd_fiche, _ARG_REQUIRED),
+            "/kholle": (self._cmd_kholle, _ARG_REQUIRED),
+            "/tutor": (self._cmd_tutor, _ARG_OPTIONAL),
+            "/formule": (self._cmd_formule, _ARG_REQUIRED),
+            "/resume": (self._cmd_resume, _ARG_REQUIRED),
+            "/cours": (self._cmd_cours, _ARG_REQUIRED),
+            "/corrige-exo": (self._cmd_corrige_exo, _ARG_REQUIRED),
+            "/corrige-exam": (self._cmd_corrige_exam, _ARG_REQUIRED),
+            "/log": (self._cmd_log, _ARG_OPTIONAL),
+            "/scope": (self._cmd_scope, _ARG_OPTIONAL),
+            "/ch": (self._cmd_ch, _ARG_REQUIRED),
+            "/bloc": (self._cmd_bloc, _ARG_REQUIRED),
+            "/type": (self._cmd_type, _ARG_REQUIRED),
+            "/reset": (self._cmd_reset, _ARG_NONE),
+        }
+        # Commandes reconnues quelle que soit la casse
+        self._dispatch_nocase = {
+            "/help": (self._cmd_help, _ARG_NONE),
+            "/aide": (self._cmd_help, _ARG_NONE),
+            "/?": (self._cmd_help, _ARG_NONE),
+            "/man": (self._cmd_man, _ARG_REQUIRED),
+            "/show": (self._cmd_show, _ARG_NONE),
+        }
+
     def run(self):
         """Boucle principale"""
         self.assistant.ensure_ready()
@@ -95,228 +158,216 @@ class MathCLI:
         """
         cmd = command.strip()
 
-        # ----- Aide -----
-        if cmd.lower() in {"/help", "/aide", "/?"}:
-            self.formatter.command_help()
-            self.formatter.info("\n🔍 Nouvelles commandes:")
-            self.formatter.info("  /blocks [chapitre]  - Liste les blocs d'un chapitre")
-            self.formatter.info("  /find-bloc <query>  - Cherche un bloc par ID ou titre")
-            return True
-
-        # ----- Manuel détaillé -----
-        if cmd.lower().startswith("/man "):
-            parts = cmd.split(maxsplit=1)
-            if len(parts) == 2:
-                self.formatter.command_manual(parts[1])
-            else:
-                self.formatter.warning("Usage: /man <commande>")
-            return True
-
-        # ----- Alias /show -> /scope show -----
-        if cmd.lower() == "/show":
-            self.formatter.scope_status(self.assistant.memory.scope_show())
-            return True
+        # Dispatch direct sur le premier mot de la commande
+        name, sep, _ = cmd.partition(" ")
+        entry = self._dispatch.get(name) or self._dispatch_nocase.get(name.lower())
+        if entry is not None:
+            handler, arg_mode = entry
+            if arg_mode == _ARG_OPTIONAL or (arg_mode == _ARG_REQUIRED) == bool(sep):
+                return handler(cmd)
 
-        # ----- Liste des blocs d'un chapitre -----
-        if cmd.startswith("/blocks"):
-            parts = cmd.split()
-            ch = parts[1] if len(parts) > 1 else None
-            
-            all_docs = self.assistant.engine._get_all_docs()
-            rows = []
-            
-            for d in all_docs:
-                if ch and str(d.metadata.get("chapter")) != str(ch):
-                    continue
-                
-                bk = (d.metadata.get("block_kind") or "").lower()
-                bid = d.metadata.get("block_id")
-                
-                if bk and bid:
-                    rows.append((
-                        str(d.metadata.get("chapter")),
-                        bk,
-                        str(bid),
-                        d.metadata.get("title") or ""
-                    ))
-            
-            if not rows:
-                self.formatter.info("Aucun bloc trouvé.")
-                return True
-            
-            # Tableau Rich
-            from rich.table import Table
-            t = Table(title=f"Blocs chapitre {ch}" if ch else "Tous les blocs", show_lines=True)
-            t.add_column("Ch.", style="cyan", justify="center")
-            t.add_column("Type", style="magenta")
-            t.add_column("ID", style="bold yellow")
-            t.add_column("Titre", style="white")
-            
-            # Tri: chapitre (numérique) > type > id
-            for r in sorted(rows, key=lambda x: (
-                int(x[0]) if x[0].isdigit() else 999,
-                x[1],
-                x[2]
-            )):
-                t.add_row(*r)
-            
-            console.print(t)
-            self.formatter.info(f"\n💡 Utilise: /ch {ch or '<N>'} puis /bloc <type> <id>")
-            return True
+        # ----- Questions méta -----
+        meta_questions = {
+            "de quoi on parlait ?", "de quoi on parlait", "on parlait de quoi ?",
+            "on parlait de quoi", "quel était le sujet ?", "quel etait le sujet ?",
+            "c'etait quoi le sujet", "c'était quoi le sujet", "on était sur quoi",
+            "on etait sur quoi"
+        }
 
-        # ----- Recherche de bloc par ID ou titre -----
-        if cmd.startswith("/find-bloc "):
-            q = cmd.split(" ", 1)[1].strip().lower()
-            
-            all_docs = self.assistant.engine._get_all_docs()
-            hits = []
-            
-            for d in all_docs:
-                bk = (d.metadata.get("block_kind") or "").lower()
-                bid = str(d.metadata.get("block_id") or "").lower()
-                title = (d.metadata.get("title") or "").lower()
-                
-                # Recherche dans ID ou titre
-                if q in bid or q in title:
-                    hits.append((
-                        d.metadata.get("chapter"),
-                        bk,
-                        bid,
-                        d.metadata.get("page"),
-                        d.metadata.get("title") or ""
-                    ))
-            
-            if not hits:
-                self.formatter.info(f"Aucun bloc correspondant à '{q}'.")
-                return True
-            
-            from rich.table import Table
-            t = Table(title=f"Résultats pour '{q}'", show_lines=True)
-            t.add_column("Ch.", style="cyan", justify="center")
-            t.add_column("Type", style="magenta")
-            t.add_column("ID", style="bold yellow")
-            t.add_column("Page", style="green", justify="right")
-            t.add_column("Titre", style="white")
-            
-            for h in hits[:40]:  # Limite 40 résultats
-                t.add_row(
-                    str(h[0]),
-                    h[1],
-                    h[2],
-                    str(h[3] or "?"),
-                    h[4]
+        if cmd.lower().strip() in meta_questions:
+            if self.assistant.memory.state.get("pinned_meta"):
+                self.formatter.info(f"Contexte épinglé: {self.assistant.memory.state['pinned_meta']}")
+            elif any([
+                self.assistant.memory.state.get("last_top_meta"),
+                self.assistant.memory.state.get("last_route"),
+                self.assistant.memory.state.get("last_question")
+            ]):
+                self.formatter.info(
+                    "Dernier contexte implicite en mémoire courte. "
+                    "Utilise /unpin ou /forget pour effacer."
                 )
-            
-            console.print(t)
-            self.formatter.info(f"\n💡 Pour cibler: /ch <N> puis /bloc <type> <id>")
-            return True
-
-        # ----- Debug on/off -----
-        if cmd.startswith("/debug"):
-            parts = cmd.split()
-            if len(parts) == 2 and parts[1].lower() in {"on", "off"}:
-                self.debug = (parts[1].lower() == "on")
-                self.formatter.success(f"Mode debug: {'activé' if self.debug else 'désactivé'}")
-            else:
-                self.formatter.warning("Usage: /debug on|off")
-            return True
-
-        # ----- Auto-link on/off -----
-        if cmd.startswith("/link"):
-            parts = cmd.split()
-            if len(parts) == 2 and parts[1].lower() in {"on", "off"}:
-                self.auto_link = (parts[1].lower() == "on")
-                self.formatter.success(f"Auto-link: {'activé' if self.auto_link else 'désactivé'}")
-            else:
-                self.formatter.warning("Usage: /link on|off")
-            return True
-
-        # ----- Hors programme on/off -----
-        if cmd.startswith("/oot"):
-            parts = cmd.split()
-            if len(parts) == 2 and parts[1].lower() in {"on", "off"}:
-                self.allow_oot = (parts[1].lower() == "on")
-                self.formatter.success(f"Hors programme: {'autorisé' if self.allow_oot else 'désactivé (RAG strict)'}")
             else:
-                self.formatter.warning("Usage: /oot on|off")
+                self.formatter.info("Aucun contexte actif")
             return True
 
-        # ----- Router override: auto|rag|llm|hybrid -----
-        if cmd.startswith("/router") or cmd.startswith("/route"):
-            parts = cmd.split(maxsplit=1)
-            if len(parts) == 1 or parts[1].strip().lower() in {"show", "status"}:
-                mode = self.assistant.memory.get_route_override() or "auto"
-                self.formatter.router_status(mode, self.allow_oot)
-                return True
-
-            mode = parts[1].strip().lower()
-            alias = {"auto": "auto", "rag": "rag", "llm": "llm", "hybrid": "hybrid"}
-            if mode in alias:
-                self.assistant.set_route_override(alias[mode])
-                self.formatter.success(f"🧭 Routeur forcé: {alias[mode]}")
-            else:
-                self.formatter.warning("Usage: /router <auto|rag|llm|hybrid>  (ou '/router show')")
-            return True
+        # Si ça commence par / mais n'est pas une commande reconnue
+        if cmd.startswith("/"):
+            return False  # On laisse passer pour gestion des filtres
 
-        # ----- Backend/runtime (local|cloud|hybrid) -----
-        if cmd.startswith("/backend") or cmd.startswith("/runtime"):
-            parts = cmd.split(maxsplit=1)
-            if len(parts) == 1 or parts[1].strip().lower() in {"show", "status"}:
-                self.formatter.backend_status({
-                    "runtime": rag_config.runtime_default_mode,
-                    "ollama_host": rag_config.ollama_host,
-                    "llm_primary": rag_config.llm_model,
-                    "llm_fallback": rag_config.llm_local_fallback,
-                    "rewrite_model": rag_config.rewrite_model,
-                    "embed_primary": rag_config.embed_model_primary,
-                    "embed_alt": rag_config.embed_model_alt,
-                    "reranker": rag_config.reranker_model if rag_config.use_reranker else "(désactivé)",
-                })
-                return True
+        return False
 
-            mode = parts[1].strip().lower()
-            if mode not in {"local", "cloud", "hybrid"}:
-                self.formatter.warning("Usage: /backend <local|cloud|hybrid>  (ou '/backend show')")
-                return True
 
-            # Essaye d'appeler une méthode de swap runtime sur l'assistant si dispo
-            swapper = getattr(self.assistant, "swap_runtime", None)
-            if callable(swapper):
-                ok, msg, snapshot = swapper(mode)
-                if ok:
-                    self.formatter.success(f"Backend: {mode} • {msg}")
-                    self.formatter.backend_status(snapshot)
-                else:
-                    self.formatter.error(f"Échec de bascule backend: {msg}")
-            else:
-                self.formatter.warning("Le runtime ne peut pas être changé à chaud dans cette version. Redémarre l'app après avoir modifié RUNTIME_MODE dans .env.")
+    # --------------------------------------------------------------------- #
+    #                       HANDLERS DES COMMANDES (/...)                    #
+    # --------------------------------------------------------------------- #
+    def _cmd_help(self, cmd: str) -> bool:
+        """Aide"""
+        self.formatter.command_help()
+        self.formatter.info("\n🔍 Nouvelles commandes:")
+        self.formatter.info("  /blocks [chapitre]  - Liste les blocs d'un chapitre")
+        self.formatter.info("  /find-bloc <query>  - Cherche un bloc par ID ou titre")
+        return True
+
+    def _cmd_man(self, cmd: str) -> bool:
+        """Manuel détaillé"""
+        parts = cmd.split(maxsplit=1)
+        if len(parts) == 2:
+            self.formatter.command_manual(parts[1])
+        else:
+            self.formatter.warning("Usage: /man <commande>")
+        return True
+
+    def _cmd_show(self, cmd: str) -> bool:
+        """Alias /show -> /scope show"""
+        self.formatter.scope_status(self.assistant.memory.scope_show())
+        return True
+
+    def _cmd_blocks(self, cmd: str) -> bool:
+        """Liste des blocs d'un chapitre"""
+        parts = cmd.split()
+        ch = parts[1] if len(parts) > 1 else None
+        
+        all_docs = self.assistant.engine._get_all_docs()
+        rows = []
+        
+        for d in all_docs:
+            if ch and str(d.metadata.get("chapter")) != str(ch):
+                continue
+            
+            bk = (d.metadata.get("block_kind") or "").lower()
+            bid = d.metadata.get("block_id")
+            
+            if bk and bid:
+                rows.append((
+                    str(d.metadata.get("chapter")),
+                    bk,
+                    str(bid),
+                    d.metadata.get("title") or ""
+                ))
+        
+        if not rows:
+            self.formatter.info("Aucun bloc trouvé.")
             return True
+        
+        # Tableau Rich
+        from rich.table import Table
+        t = Table(title=f"Blocs chapitre {ch}" if ch else "Tous les blocs", show_lines=True)
+        t.add_column("Ch.", style="cyan", justify="center")
+        t.add_column("Type", style="magenta")
+        t.add_column("ID", style="bold yellow")
+        t.add_column("Titre", style="white")
+        
+        # Tri: chapitre (numérique) > type > id
+        for r in sorted(rows, key=lambda x: (
+            int(x[0]) if x[0].isdigit() else 999,
+            x[1],
+            x[2]
+        )):
+            t.add_row(*r)
+        
+        console.print(t)
+        self.formatter.info(f"\n💡 Utilise: /ch {ch or '<N>'} puis /bloc <type> <id>")
+        return True
 
-        # ----- Afficher/Sauver le dernier passport de routage -----
-        if cmd in {"/passport", "/decision"} or cmd.startswith("/passport"):
-            if not self._last_passport:
-                self.formatter.info("Aucun passport disponible (pose une question d'abord).")
-                return True
-
-            # /passport save  ou  /passport json
-            parts = cmd.split()
-            if len(parts) == 2 and parts[1] in {"save", "json"}:
-                dirpath = ui_config.debug_dir / self.chat_id
-                dirpath.mkdir(parents=True, exist_ok=True)
-                ts = int(time.time())
-                path = dirpath / f"passport_{ts}.json"
-                with open(path, "w", encoding="utf-8") as f:
-                    json.dump(self._last_passport, f, ensure_ascii=False, indent=2)
-                self.formatter.success(f"Passport enregistré: {path}")
-            else:
-                self.formatter.passport(self._last_passport)
-                # Si le passport contient poids/penalties → affichage détaillé
-                self.formatter.debug_passport(self._last_passport)
+    def _cmd_find_bloc(self, cmd: str) -> bool:
+        """Recherche de bloc par ID ou titre"""
+        q = cmd.split(" ", 1)[1].strip().lower()
+        
+        all_docs = self.assistant.engine._get_all_docs()
+        hits = []
+        
+        for d in all_docs:
+            bk = (d.metadata.get("block_kind") or "").lower()
+            bid = str(d.metadata.get("block_id") or "").lower()
+            title = (d.metadata.get("title") or "").lower()
+            
+            # Recherche dans ID ou titre
+            if q in bid or q in title:
+                hits.append((
+                    d.metadata.get("chapter"),
+                    bk,
+                    bid,
+                    d.metadata.get("page"),
+                    d.metadata.get("title") or ""
+                ))
+        
+        if not hits:
+            self.formatter.info(f"Aucun bloc correspondant à '{q}'.")
             return True
-
-        # ----- Modèles actifs / env utiles -----
-        if cmd in {"/models", "/model"}:
-            self.formatter.models_table({
+        
+        from rich.table import Table
+        t = Table(title=f"Résultats pour '{q}'", show_lines=True)
+        t.add_column("Ch.", style="cyan", justify="center")
+        t.add_column("Type", style="magenta")
+        t.add_column("ID", style="bold yellow")
+        t.add_column("Page", style="green", justify="right")
+        t.add_column("Titre", style="white")
+        
+        for h in hits[:40]:  # Limite 40 résultats
+            t.add_row(
+                str(h[0]),
+                h[1],
+                h[2],
+                str(h[3] or "?"),
+                h[4]
+            )
+        
+        console.print(t)
+        self.formatter.info(f"\n💡 Pour cibler: /ch <N> puis /bloc <type> <id>")
+        return True
+
+    def _cmd_debug(self, cmd: str) -> bool:
+        """Debug on/off"""
+        parts = cmd.split()
+        if len(parts) == 2 and parts[1].lower() in {"on", "off"}:
+            self.debug = (parts[1].lower() == "on")
+            self.formatter.success(f"Mode debug: {'activé' if self.debug else 'désactivé'}")
+        else:
+            self.formatter.warning("Usage: /debug on|off")
+        return True
+
+    def _cmd_link(self, cmd: str) -> bool:
+        """Auto-link on/off"""
+        parts = cmd.split()
+        if len(parts) == 2 and parts[1].lower() in {"on", "off"}:
+            self.auto_link = (parts[1].lower() == "on")
+            self.formatter.success(f"Auto-link: {'activé' if self.auto_link else 'désactivé'}")
+        else:
+            self.formatter.warning("Usage: /link on|off")
+        return True
+
+    def _cmd_oot(self, cmd: str) -> bool:
+        """Hors programme on/off"""
+        parts = cmd.split()
+        if len(parts) == 2 and parts[1].lower() in {"on", "off"}:
+            self.allow_oot = (parts[1].lower() == "on")
+            self.formatter.success(f"Hors programme: {'autorisé' if self.allow_oot else 'désactivé (RAG strict)'}")
+        else:
+            self.formatter.warning("Usage: /oot on|off")
+        return True
+
+    def _cmd_router(self, cmd: str) -> bool:
+        """Router override: auto|rag|llm|hybrid"""
+        parts = cmd.split(maxsplit=1)
+        if len(parts) == 1 or parts[1].strip().lower() in {"show", "status"}:
+            mode = self.assistant.memory.get_route_override() or "auto"
+            self.formatter.router_status(mode, self.allow_oot)
+            return True
+
+        mode = parts[1].strip().lower()
+        alias = {"auto": "auto", "rag": "rag", "llm": "llm", "hybrid": "hybrid"}
+        if mode in alias:
+            self.assistant.set_route_override(alias[mode])
+            self.formatter.success(f"🧭 Routeur forcé: {alias[mode]}")
+        else:
+            self.formatter.warning("Usage: /router <auto|rag|llm|hybrid>  (ou '/router show')")
+        return True
+
+    def _cmd_backend(self, cmd: str) -> bool:
+        """Backend/runtime (local|cloud|hybrid)"""
+        parts = cmd.split(maxsplit=1)
+        if len(parts) == 1 or parts[1].strip().lower() in {"show", "status"}:
+            self.formatter.backend_status({
                 "runtime": rag_config.runtime_default_mode,
                 "ollama_host": rag_config.ollama_host,
                 "llm_primary": rag_config.llm_model,
@@ -328,325 +379,363 @@ class MathCLI:
             })
             return True
 
-        if cmd in {"/where", "/paths"}:
-            self.formatter.paths({
-                "log_dir": str(ui_config.log_dir / self.chat_id),
-                "debug_dir": str(ui_config.debug_dir / self.chat_id),
-                "db_dir": str(rag_config.db_dir),
-                "pdf_path": str(rag_config.pdf_path),
-            })
-            return True
-
-        # ----- Pin / Unpin -----
-        if cmd == "/pin":
-            meta = self.assistant.memory.best_context_meta()
-            if not meta:
-                meta = self.assistant.memory.state.get("last_top_meta") or {"info": "(aucun contexte)"}
-            self.assistant.memory.state["pinned_meta"] = meta
-            self.formatter.success(f"Contexte épinglé: {meta}")
-            return True
-
-        if cmd == "/unpin":
-            self.assistant.memory.reset(full=False)
-            self.formatter.success("Contexte désépinglé et mémoire courte réinitialisée")
+        mode = parts[1].strip().lower()
+        if mode not in {"local", "cloud", "hybrid"}:
+            self.formatter.warning("Usage: /backend <local|cloud|hybrid>  (ou '/backend show')")
             return True
 
-        # ----- Forget -----
-        if cmd == "/forget":
-            self.assistant.memory.reset(full=True)
-            self.tutor_mode = False
-            self.tutor_strict = False
-            self.tutor_explain = False
-            self.formatter.success("Mémoire courte et portée nettoyées • Mode tuteur désactivé")
-            return True
-
-        # ----- New chat -----
-        if cmd == "/new-chat":
-            self.assistant.new_session(reset_scope=True, preserve_logs=True)
-            self.chat_id = self.assistant.memory.chat_id
-            self.auto_link = True
-            self.auto_pin_next = True
-            self.tutor_mode = False
-            self.tutor_strict = False
-            self.tutor_explain = False
-            self._last_passport = None
-            self._last_debug = None
-            self.formatter.success(
-                f"Nouveau chat: {self.chat_id} | Auto-link activé | Auto-pin au prochain contexte | Mode tuteur désactivé"
-            )
-            return True
-
-        # ----- Raccourcis de tâches -----
-        if cmd.startswith("/qcm "):
-            notion = cmd.split(" ", 1)[1].strip()
-            payload = self.assistant.run_task("qcm", notion)
-            self._capture_backend_debug(payload)
-            self.formatter.sources_table(payload["docs"])
-            self.formatter.answer(payload["answer"])
-            return True
-
-        if cmd.startswith("/exam "):
-            ch = cmd.split(" ", 1)[1].strip()
-            payload = self.assistant.run_task("exam_gen", f"Exam chapters {ch}", chapters=ch)
-            self._capture_backend_debug(payload)
-            self.formatter.sources_table(payload["docs"])
-            self.formatter.answer(payload["answer"])
-            return True
+        # Essaye d'appeler une méthode de swap runtime sur l'assistant si dispo
+        swapper = getattr(self.assistant, "swap_runtime", None)
+        if callable(swapper):
+            ok, msg, snapshot = swapper(mode)
+            if ok:
+                self.formatter.success(f"Backend: {mode} • {msg}")
+                self.formatter.backend_status(snapshot)
+            else:
+                self.formatter.error(f"Échec de bascule backend: {msg}")
+        else:
+            self.formatter.warning("Le runtime ne peut pas être changé à chaud dans cette version. Redémarre l'app après avoir modifié RUNTIME_MODE dans .env.")
+        return True
+
+    def _cmd_passport(self, cmd: str) -> bool:
+        """Afficher/Sauver le dernier passport de routage"""
+        if not self._last_passport:
+            self.formatter.info("Aucun passport disponible (pose une question d'abord).")
+            return True
+
+        # /passport save  ou  /passport json
+        parts = cmd.split()
+        if len(parts) == 2 and parts[1] in {"save", "json"}:
+            dirpath = ui_config.debug_dir / self.chat_id
+            dirpath.mkdir(parents=True, exist_ok=True)
+            ts = int(time.time())
+            path = dirpath / f"passport_{ts}.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self._last_passport, f, ensure_ascii=False, indent=2)
+            self.formatter.success(f"Passport enregistré: {path}")
+        else:
+            self.formatter.passport(self._last_passport)
+            # Si le passport contient poids/penalties → affichage détaillé
+            self.formatter.debug_passport(self._last_passport)
+        return True
+
+    def _cmd_models(self, cmd: str) -> bool:
+        """Modèles actifs / env utiles"""
+        self.formatter.models_table({
+            "runtime": rag_config.runtime_default_mode,
+            "ollama_host": rag_config.ollama_host,
+            "llm_primary": rag_config.llm_model,
+            "llm_fallback": rag_config.llm_local_fallback,
+            "rewrite_model": rag_config.rewrite_model,
+            "embed_primary": rag_config.embed_model_primary,
+            "embed_alt": rag_config.embed_model_alt,
+            "reranker": rag_config.reranker_model if rag_config.use_reranker else "(désactivé)",
+        })
+        return True
+
+    def _cmd_where(self, cmd: str) -> bool:
+        """Chemins utiles (logs, debug, base, PDF)"""
+        self.formatter.paths({
+            "log_dir": str(ui_config.log_dir / self.chat_id),
+            "debug_dir": str(ui_config.debug_dir / self.chat_id),
+            "db_dir": str(rag_config.db_dir),
+            "pdf_path": str(rag_config.pdf_path),
+        })
+        return True
+
+    def _cmd_pin(self, cmd: str) -> bool:
+        """Épingler le meilleur contexte courant"""
+        meta = self.assistant.memory.best_context_meta()
+        if not meta:
+            meta = self.assistant.memory.state.get("last_top_meta") or {"info": "(aucun contexte)"}
+        self.assistant.memory.state["pinned_meta"] = meta
+        self.formatter.success(f"Contexte épinglé: {meta}")
+        return True
+
+    def _cmd_unpin(self, cmd: str) -> bool:
+        """Désépingler le contexte"""
+        self.assistant.memory.reset(full=False)
+        self.formatter.success("Contexte désépinglé et mémoire courte réinitialisée")
+        return True
+
+    def _cmd_forget(self, cmd: str) -> bool:
+        """Oublier mémoire courte et portée, désactiver le tuteur"""
+        self.assistant.memory.reset(full=True)
+        self.tutor_mode = False
+        self.tutor_strict = False
+        self.tutor_explain = False
+        self.formatter.success("Mémoire courte et portée nettoyées • Mode tuteur désactivé")
+        return True
+
+    def _cmd_new_chat(self, cmd: str) -> bool:
+        """Nouvelle session de chat"""
+        self.assistant.new_session(reset_scope=True, preserve_logs=True)
+        self.chat_id = self.assistant.memory.chat_id
+        self.auto_link = True
+        self.auto_pin_next = True
+        self.tutor_mode = False
+        self.tutor_strict = False
+        self.tutor_explain = False
+        self._last_passport = None
+        self._last_debug = None
+        self.formatter.success(
+            f"Nouveau chat: {self.chat_id} | Auto-link activé | Auto-pin au prochain contexte | Mode tuteur désactivé"
+        )
+        return True
+
+    def _cmd_qcm(self, cmd: str) -> bool:
+        """Tâche QCM"""
+        notion = cmd.split(" ", 1)[1].strip()
+        payload = self.assistant.run_task("qcm", notion)
+        self._capture_backend_debug(payload)
+        self.formatter.sources_table(payload["docs"])
+        self.formatter.answer(payload["answer"])
+        return True
 
-        if cmd.startswith("/fiche "):
-            notion = cmd.split(" ", 1)[1].strip()
-            payload = self.assistant.run_task("sheet_create", notion)
-            self._capture_backend_debug(payload)
-            self.formatter.sources_table(payload["docs"])
-            self.formatter.answer(payload["answer"])
-            return True
+    def _cmd_exam(self, cmd: str) -> bool:
+        """Tâche sujet d'examen"""
+        ch = cmd.split(" ", 1)[1].strip()
+        payload = self.assistant.run_task("exam_gen", f"Exam chapters {ch}", chapters=ch)
+        self._capture_backend_debug(payload)
+        self.formatter.sources_table(payload["docs"])
+        self.formatter.answer(payload["answer"])
+        return True
 
-        if cmd.startswith("/kholle "):
-            notion = cmd.split(" ", 1)[1].strip()
-            payload = self.assistant.run_task("kholle", notion)
-            self._capture_backend_debug(payload)
-            self.formatter.sources_table(payload["docs"])
-            self.formatter.answer(payload["answer"])
-            return True
+    def _cmd_fiche(self, cmd: str) -> bool:
+        """Tâche fiche de révision"""
+        notion = cmd.split(" ", 1)[1].strip()
+        payload = self.assistant.run_task("sheet_create", notion)
+        self._capture_backend_debug(payload)
+        self.formatter.sources_table(payload["docs"])
+        self.formatter.answer(payload["answer"])
+        return True
 
-        if cmd.startswith("/tutor"):
-            parts = cmd.split()
-            if len(parts) == 1:
-                # /tutor seul → afficher le status
-                mode_str = "activé" if self.tutor_mode else "désactivé"
-                if self.tutor_mode:
-                    if self.tutor_strict:
-                        type_str = "strict (tout en guidage)"
-                    else:
-                        type_str = "smart (détection auto)"
-                    status = f"Mode tuteur: {mode_str} • Type: {type_str}"
-                else:
-                    status = f"Mode tuteur: {mode_str}"
-                
-                explain_str = "activé" if self.tutor_explain else "désactivé"
-                status += f" • Mode explain: {explain_str}"
-                self.formatter.info(status)
-                return True
-            
-            arg = parts[1].lower()
-            
-            # /tutor on [strict|smart]
-            if arg == "on":
-                self.tutor_mode = True
-                # Déterminer le type (strict ou smart)
-                if len(parts) >= 3 and parts[2].lower() == "strict":
-                    self.tutor_strict = True
-                    self.formatter.success("🎓 Mode tuteur activé (strict) - Toutes les réponses en guidage pédagogique")
+    def _cmd_kholle(self, cmd: str) -> bool:
+        """Tâche khôlle"""
+        notion = cmd.split(" ", 1)[1].strip()
+        payload = self.assistant.run_task("kholle", notion)
+        self._capture_backend_debug(payload)
+        self.formatter.sources_table(payload["docs"])
+        self.formatter.answer(payload["answer"])
+        return True
+
+    def _cmd_tutor(self, cmd: str) -> bool:
+        """Mode tuteur (on/off/explain) ou question ponctuelle"""
+        parts = cmd.split()
+        if len(parts) == 1:
+            # /tutor seul → afficher le status
+            mode_str = "activé" if self.tutor_mode else "désactivé"
+            if self.tutor_mode:
+                if self.tutor_strict:
+                    type_str = "strict (tout en guidage)"
                 else:
-                    self.tutor_strict = False
-                    self.formatter.success("🎓 Mode tuteur activé (smart) - Détection auto : exercices → guidage, théorie → normal")
-                return True
+                    type_str = "smart (détection auto)"
+                status = f"Mode tuteur: {mode_str} • Type: {type_str}"
+            else:
+                status = f"Mode tuteur: {mode_str}"
             
-            # /tutor off
-            if arg == "off":
-                self.tutor_mode = False
+            explain_str = "activé" if self.tutor_explain else "désactivé"
+            status += f" • Mode explain: {explain_str}"
+            self.formatter.info(status)
+            return True
+        
+        arg = parts[1].lower()
+        
+        # /tutor on [strict|smart]
+        if arg == "on":
+            self.tutor_mode = True
+            # Déterminer le type (strict ou smart)
+            if len(parts) >= 3 and parts[2].lower() == "strict":
+                self.tutor_strict = True
+                self.formatter.success("🎓 Mode tuteur activé (strict) - Toutes les réponses en guidage pédagogique")
+            else:
                 self.tutor_strict = False
-                self.formatter.success("Mode tuteur désactivé")
-                return True
-            
-            # /tutor explain [on|off]
-            if arg == "explain":
-                if len(parts) >= 3:
-                    sub_arg = parts[2].lower()
-                    if sub_arg == "on":
-                        self.tutor_explain = True
-                        self.formatter.success("🧠 Mode explain activé - Guidage socratique pour la compréhension de cours/théorèmes")
-                        return True
-                    elif sub_arg == "off":
-                        self.tutor_explain = False
-                        self.formatter.success("Mode explain désactivé")
-                        return True
-                
-                # /tutor explain <question> → mode ponctuel explanation
-                st = cmd.split(" ", 2)[2].strip() if len(parts) >= 3 else ""
-                if st:
-                    payload = self.assistant.run_task("tutor", st, with_solutions=False)
-                    self._capture_backend_debug(payload)
-                    self.formatter.info("🧠 Mode explain - Guidage socratique")
-                    self.formatter.sources_table(payload["docs"])
-                    self.formatter.answer(payload["answer"])
-                    return True
-                else:
-                    self.formatter.warning("Usage: /tutor explain on|off ou /tutor explain <question>")
+                self.formatter.success("🎓 Mode tuteur activé (smart) - Détection auto : exercices → guidage, théorie → normal")
+            return True
+        
+        # /tutor off
+        if arg == "off":
+            self.tutor_mode = False
+            self.tutor_strict = False
+            self.formatter.success("Mode tuteur désactivé")
+            return True
+        
+        # /tutor explain [on|off]
+        if arg == "explain":
+            if len(parts) >= 3:
+                sub_arg = parts[2].lower()
+                if sub_arg == "on":
+                    self.tutor_explain = True
+                    self.formatter.success("🧠 Mode explain activé - Guidage socratique pour la compréhension de cours/théorèmes")
                     return True
-            
-            # /tutor <question> → mode ponctuel (comme avant)
-            if len(parts) >= 2:
-                st = cmd.split(" ", 1)[1].strip()
-                if st.lower() not in {"on", "off", "strict", "smart", "explain"}:
-                    payload = self.assistant.run_task("tutor", st, with_solutions=False)
-                    self._capture_backend_debug(payload)
-                    self.formatter.sources_table(payload["docs"])
-                    self.formatter.answer(payload["answer"])
+                elif sub_arg == "off":
+                    self.tutor_explain = False
+                    self.formatter.success("Mode explain désactivé")
                     return True
             
-            self.formatter.warning("Usage: /tutor [on|off] [strict|smart] | /tutor explain [on|off] | /tutor <question>")
-            return True
-
-        if cmd.startswith("/formule "):
-            q = cmd.split(" ", 1)[1].strip()
-            payload = self.assistant.run_task("formula", q)
-            self._capture_backend_debug(payload)
-            self.formatter.sources_table(payload["docs"])
-            self.formatter.answer(payload["answer"])
-            return True
-
-        if cmd.startswith("/resume "):
-            q = cmd.split(" ", 1)[1].strip()
-            payload = self.assistant.run_task("course_summary", q)
-            self._capture_backend_debug(payload)
-            self.formatter.sources_table(payload["docs"])
-            self.formatter.answer(payload["answer"])
-            return True
-
-        if cmd.startswith("/cours "):
-            q = cmd.split(" ", 1)[1].strip()
-            payload = self.assistant.run_task("course_build", q)
-            self._capture_backend_debug(payload)
-            self.formatter.sources_table(payload["docs"])
-            self.formatter.answer(payload["answer"])
-            return True
-
-        if cmd.startswith("/corrige-exo "):
-            st = cmd.split(" ", 1)[1].strip()
-            payload = self.assistant.run_task("exercise_correct", "Correction exercice", statement=st, student_answer="")
-            self._capture_backend_debug(payload)
-            self.formatter.sources_table(payload["docs"])
-            self.formatter.answer(payload["answer"])
-            return True
-
-        if cmd.startswith("/corrige-exam "):
-            st = cmd.split(" ", 1)[1].strip()
-            payload = self.assistant.run_task("exam_correct", "Correction examen", statement=st, student_answer="")
-            self._capture_backend_debug(payload)
-            self.formatter.sources_table(payload["docs"])
-            self.formatter.answer(payload["answer"])
-            return True
-
-        # ----- Log -----
-        if cmd.startswith("/log"):
-            parts = cmd.split()
-            if len(parts) == 2 and parts[1] == "save":
-                dirpath = ui_config.log_dir / self.chat_id
-                dirpath.mkdir(parents=True, exist_ok=True)
-                ts = int(time.time())
-                path = dirpath / f"{ts}.jsonl"
-                self.assistant.memory.save_log(str(path))
-                self.formatter.success(f"Log sauvegardé: {path}")
+            # /tutor explain <question> → mode ponctuel explanation
+            st = cmd.split(" ", 2)[2].strip() if len(parts) >= 3 else ""
+            if st:
+                payload = self.assistant.run_task("tutor", st, with_solutions=False)
+                self._capture_backend_debug(payload)
+                self.formatter.info("🧠 Mode explain - Guidage socratique")
+                self.formatter.sources_table(payload["docs"])
+                self.formatter.answer(payload["answer"])
+                return True
             else:
-                self.formatter.warning("Usage: /log save")
-            return True
-
-        # ----- Scope -----
-        if cmd.startswith("/scope"):
-            parts = cmd.split()
-            if len(parts) == 1 or parts[1] == "show":
-                self.formatter.scope_status(self.assistant.memory.scope_show())
+                self.formatter.warning("Usage: /tutor explain on|off ou /tutor explain <question>")
                 return True
-
-            if parts[1] == "clear":
-                self.assistant.memory.scope_clear()
-                self.formatter.success("Portée réinitialisée")
+        
+        # /tutor <question> → mode ponctuel (comme avant)
+        if len(parts) >= 2:
+            st = cmd.split(" ", 1)[1].strip()
+            if st.lower() not in {"on", "off", "strict", "smart", "explain"}:
+                payload = self.assistant.run_task("tutor", st, with_solutions=False)
+                self._capture_backend_debug(payload)
+                self.formatter.sources_table(payload["docs"])
+                self.formatter.answer(payload["answer"])
                 return True
+        
+        self.formatter.warning("Usage: /tutor [on|off] [strict|smart] | /tutor explain [on|off] | /tutor <question>")
+        return True
+
+    def _cmd_formule(self, cmd: str) -> bool:
+        """Tâche formule"""
+        q = cmd.split(" ", 1)[1].strip()
+        payload = self.assistant.run_task("formula", q)
+        self._capture_backend_debug(payload)
+        self.formatter.sources_table(payload["docs"])
+        self.formatter.answer(payload["answer"])
+        return True
 
-            if parts[1] == "set":
-                kvs = {}
-                for token in parts[2:]:
-                    if "=" in token:
-                        k, v = token.split("=", 1)
-                        k = k.strip().lower()
-                        v = v.strip()
-                        if k in {"chapter", "block_kind", "block_id", "type"}:
-                            kvs[k] = v
-                self.assistant.memory.scope_set(**kvs)
-                self.formatter.success(f"Portée mise à jour: {self.assistant.memory.scope_show()}")
-                return True
+    def _cmd_resume(self, cmd: str) -> bool:
+        """Tâche résumé de cours"""
+        q = cmd.split(" ", 1)[1].strip()
+        payload = self.assistant.run_task("course_summary", q)
+        self._capture_backend_debug(payload)
+        self.formatter.sources_table(payload["docs"])
+        self.formatter.answer(payload["answer"])
+        return True
 
-            self.formatter.warning("Usage: /scope <show|clear|set k=v ...>")
-            return True
+    def _cmd_cours(self, cmd: str) -> bool:
+        """Tâche cours"""
+        q = cmd.split(" ", 1)[1].strip()
+        payload = self.assistant.run_task("course_build", q)
+        self._capture_backend_debug(payload)
+        self.formatter.sources_table(payload["docs"])
+        self.formatter.answer(payload["answer"])
+        return True
 
-        # ----- Raccourcis scope -----
-        if cmd.startswith("/ch "):
-            ch = cmd.split(" ", 1)[1].strip()
-            self.assistant.memory.scope_set(chapter=ch)
-            self.formatter.success(f"Chapitre défini: {ch}")
-            self.formatter.info("💡 Utilise /blocks pour voir les blocs disponibles")
-            return True
+    def _cmd_corrige_exo(self, cmd: str) -> bool:
+        """Tâche correction d'exercice"""
+        st = cmd.split(" ", 1)[1].strip()
+        payload = self.assistant.run_task("exercise_correct", "Correction exercice", statement=st, student_answer="")
+        self._capture_backend_debug(payload)
+        self.formatter.sources_table(payload["docs"])
+        self.formatter.answer(payload["answer"])
+        return True
 
-        if cmd.startswith("/bloc "):
-            try:
-                _, rest = cmd.split(" ", 1)
-                parts = rest.split()
-                if len(parts) < 2:
-                    self.formatter.warning("Usage: /bloc <type> <id>")
-                    self.formatter.info("Exemples: /bloc theoreme 3.7 | /bloc definition 3.2")
-                    return True
-                
-                kind = parts[0].strip()
-                bid = parts[1].strip()
-                
-                # Normalisation sans accents
-                from src.utils import normalize_whitespace
-                kind_norm = normalize_whitespace(kind).lower()
-                kind_norm = (
-                    kind_norm
-                    .replace("é", "e").replace("è", "e").replace("ê", "e")
-                    .replace("à", "a").replace("ô", "o").replace("û", "u")
-                )
-                
-                self.assistant.memory.scope_set(block_kind=kind_norm, block_id=bid)
-                self.formatter.success(f"Bloc défini: {kind_norm} {bid}")
-                self.formatter.info("💡 Vérifie avec /show ou /scope show")
-            except Exception as e:
-                self.formatter.warning("Usage: /bloc <théorème|définition|proposition|corollaire> <id>")
-                self.formatter.info(f"Erreur: {e}")
-            return True
+    def _cmd_corrige_exam(self, cmd: str) -> bool:
+        """Tâche correction d'examen"""
+        st = cmd.split(" ", 1)[1].strip()
+        payload = self.assistant.run_task("exam_correct", "Correction examen", statement=st, student_answer="")
+        self._capture_backend_debug(payload)
+        self.formatter.sources_table(payload["docs"])
+        self.formatter.answer(payload["answer"])
+        return True
+
+    def _cmd_log(self, cmd: str) -> bool:
+        """Sauvegarde du log de session"""
+        parts = cmd.split()
+        if len(parts) == 2 and parts[1] == "save":
+            dirpath = ui_config.log_dir / self.chat_id
+            dirpath.mkdir(parents=True, exist_ok=True)
+            ts = int(time.time())
+            path = dirpath / f"{ts}.jsonl"
+            self.assistant.memory.save_log(str(path))
+            self.formatter.success(f"Log sauvegardé: {path}")
+        else:
+            self.formatter.warning("Usage: /log save")
+        return True
 
-        if cmd.startswith("/type "):
-            t = cmd.split(" ", 1)[1].strip().lower()
-            self.assistant.memory.scope_set(type=t)
-            self.formatter.success(f"Type défini: {t}")
+    def _cmd_scope(self, cmd: str) -> bool:
+        """Portée: show | clear | set k=v ..."""
+        parts = cmd.split()
+        if len(parts) == 1 or parts[1] == "show":
+            self.formatter.scope_status(self.assistant.memory.scope_show())
             return True
 
-        if cmd == "/reset":
+        if parts[1] == "clear":
             self.assistant.memory.scope_clear()
             self.formatter.success("Portée réinitialisée")
             return True
 
-        # ----- Questions méta -----
-        meta_questions = {
-            "de quoi on parlait ?", "de quoi on parlait", "on parlait de quoi ?",
-            "on parlait de quoi", "quel était le sujet ?", "quel etait le sujet ?",
-            "c'etait quoi le sujet", "c'était quoi le sujet", "on était sur quoi",
-            "on etait sur quoi"
-        }
-
-        if cmd.lower().strip() in meta_questions:
-            if self.assistant.memory.state.get("pinned_meta"):
-                self.formatter.info(f"Contexte épinglé: {self.assistant.memory.state['pinned_meta']}")
-            elif any([
-                self.assistant.memory.state.get("last_top_meta"),
-                self.assistant.memory.state.get("last_route"),
-                self.assistant.memory.state.get("last_question")
-            ]):
-                self.formatter.info(
-                    "Dernier contexte implicite en mémoire courte. "
-                    "Utilise /unpin ou /forget pour effacer."
-                )
-            else:
-                self.formatter.info("Aucun contexte actif")
-            return True
-
-        # Si ça commence par / mais n'est pas une commande reconnue
-        if cmd.startswith("/"):
-            return False  # On laisse passer pour gestion des filtres
-
-        return False
+        if parts[1] == "set":
+            kvs = {}
+            for token in parts[2:]:
+                if "=" in token:
+                    k, v = token.split("=", 1)
+                    k = k.strip().lower()
+                    v = v.strip()
+                    if k in {"chapter", "block_kind", "block_id", "type"}:
+                        kvs[k] = v
+            self.assistant.memory.scope_set(**kvs)
+            self.formatter.success(f"Portée mise à jour: {self.assistant.memory.scope_show()}")
+            return True
+
+        self.formatter.warning("Usage: /scope <show|clear|set k=v ...>")
+        return True
+
+    def _cmd_ch(self, cmd: str) -> bool:
+        """Raccourci scope: chapitre"""
+        ch = cmd.split(" ", 1)[1].strip()
+        self.assistant.memory.scope_set(chapter=ch)
+        self.formatter.success(f"Chapitre défini: {ch}")
+        self.formatter.info("💡 Utilise /blocks pour voir les blocs disponibles")
+        return True
+
+    def _cmd_bloc(self, cmd: str) -> bool:
+        """Raccourci scope: bloc (type + id)"""
+        try:
+            _, rest = cmd.split(" ", 1)
+            parts = rest.split()
+            if len(parts) < 2:
+                self.formatter.warning("Usage: /bloc <type> <id>")
+                self.formatter.info("Exemples: /bloc theoreme 3.7 | /bloc definition 3.2")
+                return True
+            
+            kind = parts[0].strip()
+            bid = parts[1].strip()
+            
+            # Normalisation sans accents
+            from src.utils import normalize_whitespace
+            kind_norm = normalize_whitespace(kind).lower()
+            kind_norm = (
+                kind_norm
+                .replace("é", "e").replace("è", "e").replace("ê", "e")
+                .replace("à", "a").replace("ô", "o").replace("û", "u")
+            )
+            
+            self.assistant.memory.scope_set(block_kind=kind_norm, block_id=bid)
+            self.formatter.success(f"Bloc défini: {kind_norm} {bid}")
+            self.formatter.info("💡 Vérifie avec /show ou /scope show")
+        except Exception as e:
+            self.formatter.warning("Usage: /bloc <théorème|définition|proposition|corollaire> <id>")
+            self.formatter.info(f"Erreur: {e}")
+        return True
+
+    def _cmd_type(self, cmd: str) -> bool:
+        """Raccourci scope: type de document"""
+        t = cmd.split(" ", 1)[1].strip().lower()
+        self.assistant.memory.scope_set(type=t)
+        self.formatter.success(f"Type défini: {t}")
+        return True
+
+    def _cmd_reset(self, cmd: str) -> bool:
+        """Réinitialiser la portée"""
+        self.assistant.memory.scope_clear()
+        self.formatter.success("Portée réinitialisée")
+        return True
 
     # --------------------------------------------------------------------- #
     #                        FLUX QUESTION → RÉPONSE                        #
@@ -661,21 +750,11 @@ class MathCLI:
             if len(parts) == 2:
                 cmd, payload = parts[0].lower(), parts[1]
 
-                if cmd == "/exercice":
-                    filter_type = "exercice"
-                    question = payload
-                elif cmd in {"/méthode", "/methode"}:
-                    filter_type = "méthode"
-                    question = payload
-                elif cmd in {"/théorie", "/theorie"}:
-                    filter_type = "théorie"
-                    question = payload
-                elif cmd == "/cours":
-                    filter_type = None
-                    question = payload
-                else:
+                if cmd not in _QUICK_FILTERS:
                     self.formatter.warning(f"Commande inconnue: {cmd}")
                     return
+                filter_type = _QUICK_FILTERS[cmd]
+                question = payload
             else:
                 self.formatter.warning("Format: /commande <question>")
                 return
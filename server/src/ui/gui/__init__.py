@@ -4,7 +4,6 @@ src/ui/gui/__init__.py
 Package GUI pour l'assistant RAG de maths
 """
 
-from .app import main, MainWindow
 from .widgets import (
     AnswerViewer,
     SourcesTable,
@@ -32,4 +31,17 @@ __all__ = [
     'GLOBAL_STYLE',
     'KATEX_HTML_TEMPLATE',
     'ICONS',
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str):
+    """
+    Import différé de l'application (PEP 562) : .app charge tout l'assistant
+    (LLM, RAG) ; importer les widgets ou les styles ne doit pas le payer.
+    """
+    if name in ('main', 'MainWindow'):
+        from . import app
+        value = getattr(app, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
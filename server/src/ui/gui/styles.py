@@ -492,6 +492,10 @@ KATEX_HTML_TEMPLATE = """<!doctype html>
 </body>
 </html>"""
 
+# Template pré-découpé autour du corps : prefix + html + suffix évite de
+# ré-analyser le format (et ses {{ }}) à chaque rendu
+KATEX_HTML_PREFIX, KATEX_HTML_SUFFIX = KATEX_HTML_TEMPLATE.format(html="\0").split("\0")
+
 # Icônes Unicode
 ICONS = {
     'pin': '📌',
@@ -5,7 +5,8 @@ Widgets réutilisables pour l'interface GUI
 """
 
 from __future__ import annotations
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+from functools import lru_cache, partial
 import re
 
 from PySide6 import QtCore, QtGui, QtWidgets
@@ -16,29 +17,91 @@ try:
 except ImportError:
     WEBENGINE_AVAILABLE = False
 
-from .styles import KATEX_HTML_TEMPLATE, ICONS
+from .styles import KATEX_HTML_PREFIX, KATEX_HTML_SUFFIX, ICONS
 
 # Import des utilitaires de traitement de texte
-from src.utils import truncate_text, clean_text, extract_latex_formulas, escape_latex_in_text, restore_latex_formulas
+from src.utils import truncate_text, clean_text, escape_latex_in_text, restore_latex_formulas
+
+# truncate_text est pure : on mémoïse les aperçus (mêmes sources réaffichées)
+_truncate = lru_cache(maxsize=1024)(truncate_text)
+
+# Longueurs de l'aperçu (cellule) et de l'infobulle
+_PREVIEW_LENGTH = 140
+_TOOLTIP_LENGTH = 500
 
 
 # ===== HELPER FUNCTIONS =====
 
+# Marqueur des formules pendant le rendu (NUL absent du texte affiché)
+_LATEX_MARK = '\x00L{}\x00'
+
+
+def _escape_latex(markdown: str) -> Tuple[str, Dict[str, Tuple[str, str]]]:
+    """Remplace les formules LaTeX par des marqueurs (voir escape_latex_in_text)"""
+    if '\x00' in markdown:
+        markdown = markdown.replace('\x00', '')
+    return escape_latex_in_text(markdown, _LATEX_MARK)
+
+
+_FORM_MARGINS = (12, 12, 12, 12)
+_FORM_SPACING = 10
+_NO_MARGINS = (0, 0, 0, 0)
+
+
+def _apply_layout_style(lay: QtWidgets.QLayout, margins=_NO_MARGINS, spacing: int = 8):
+    """Applique marges et espacement à un layout"""
+    lay.setContentsMargins(*margins)
+    lay.setSpacing(spacing)
+
+
+# Types de contenu proposés par les combos (après l'entrée « vide »)
+_TYPE_NAMES = ("exercice", "méthode", "théorie", "cours")
+
+
 def markdown_to_html_with_latex(markdown: str) -> str:
     """
     Convertit Markdown en HTML en préservant parfaitement le LaTeX pour KaTeX.
     Version optimisée pour l'affichage avec KaTeX auto-render.
+    Fonction pure : mémoïsée (accueil, chargement, réaffichage, export).
     """
+    # Les longues réponses passent hors cache
+    if len(markdown) > _MD_LATEX_CACHE_MAX_LEN:
+        return _markdown_to_html_with_latex(markdown)
+    return _markdown_to_html_with_latex_cached(markdown)
+
+
+def _markdown_to_html_with_latex(markdown: str) -> str:
+    """Conversion effective (sans cache)"""
     # Étape 1: Extraire et remplacer temporairement le LaTeX
-    text, latex_replacements = escape_latex_in_text(markdown, placeholder="§§§LATEX{}§§§")
+    text, latex_formulas = _escape_latex(markdown)
+
+    html = _render_core(text)
+
+    # Étape 2: Restaurer le LaTeX
+    return restore_latex_formulas(html, latex_formulas)
 
+
+# Cache des messages courts (accueil, chargement, réaffichage)
+_MD_LATEX_CACHE_MAX_LEN = 64_000
+_markdown_to_html_with_latex_cached = lru_cache(maxsize=128)(_markdown_to_html_with_latex)
+
+
+def _render_core(text: str) -> str:
+    """
+    Rendu Markdown -> HTML ligne à ligne (LaTeX déjà remplacé par des marqueurs).
+    Sans dépendance Qt.
+    """
     lines = text.splitlines()
     html_lines = []
     in_code_block = False
     in_list = False
 
     for line in lines:
-        stripped = line.strip()
+        # Copier la ligne seulement si nécessaire : indentation, ou titre/liste
+        # dont le contenu est extrait (les paragraphes gardent `line` tel quel)
+        stripped = line.lstrip() if line[:1].isspace() else line
+        if stripped[:1] in '#-*':
+            stripped = stripped.rstrip()
 
         # Code blocks
         if stripped.startswith('```'):
@@ -94,30 +157,28 @@ def markdown_to_html_with_latex(markdown: str) -> str:
     if in_list:
         html_lines.append('</ul>')
 
-    html = '\n'.join(html_lines)
+    return '\n'.join(html_lines)
 
-    # Étape 2: Restaurer le LaTeX
-    html = restore_latex_formulas(html, latex_replacements)
-
-    return html
 
-
-def format_inline_markdown(text: str) -> str:
-    """Formate les éléments inline Markdown (gras, italique, code, liens)"""
+# Règles inline appliquées dans l'ordre (gras, italique, code, liens)
+_INLINE_MD_RULES = tuple((re.compile(pattern), repl) for pattern, repl in (
     # Bold: **text** ou __text__
-    text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
-    text = re.sub(r'__(.+?)__', r'<strong>\1</strong>', text)
-
+    (r'\*\*(.+?)\*\*', r'<strong>\1</strong>'),
+    (r'__(.+?)__', r'<strong>\1</strong>'),
     # Italic: *text* ou _text_ (mais pas ** ou __)
-    text = re.sub(r'(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)', r'<em>\1</em>', text)
-    text = re.sub(r'(?<!_)_(?!_)(.+?)(?<!_)_(?!_)', r'<em>\1</em>', text)
-
+    (r'(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)', r'<em>\1</em>'),
+    (r'(?<!_)_(?!_)(.+?)(?<!_)_(?!_)', r'<em>\1</em>'),
     # Inline code: `text`
-    text = re.sub(r'`(.+?)`', r'<code>\1</code>', text)
-
+    (r'`(.+?)`', r'<code>\1</code>'),
     # Links: [text](url)
-    text = re.sub(r'\[(.+?)\]\((.+?)\)', r'<a href="\2">\1</a>', text)
+    (r'\[(.+?)\]\((.+?)\)', r'<a href="\2">\1</a>'),
+))
 
+
+def format_inline_markdown(text: str) -> str:
+    """Formate les éléments inline Markdown (gras, italique, code, liens)"""
+    for pattern, repl in _INLINE_MD_RULES:
+        text = pattern.sub(repl, text)
     return text
 
 
@@ -137,19 +198,15 @@ class AnswerViewer(QtWidgets.QWidget):
     def __init__(self, parent: Optional[QtWidgets.QWidget] = None):
         super().__init__(parent)
 
-        layout = QtWidgets.QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-
-        # Utiliser WebEngine si disponible, sinon TextBrowser
-        if WEBENGINE_AVAILABLE:
-            self.view = QWebEngineView()
-            self._use_katex = True
-        else:
-            self.view = QtWidgets.QTextBrowser()
-            self.view.setOpenExternalLinks(True)
-            self._use_katex = False
-
-        layout.addWidget(self.view)
+        # Messages (accueil, chargement, erreurs) dans un QTextBrowser léger ;
+        # la vue WebEngine (process Chromium) n'est créée qu'à la première réponse
+        self._stack = QtWidgets.QStackedLayout(self)
+        self._stack.setContentsMargins(0, 0, 0, 0)
+        self._browser = QtWidgets.QTextBrowser()
+        self._browser.setOpenExternalLinks(True)
+        self._stack.addWidget(self._browser)
+        self._web: Optional[QWebEngineView] = None
+        self._use_katex = WEBENGINE_AVAILABLE
 
         self._last_markdown: str = ""
         self._last_html: str = ""
@@ -157,6 +214,22 @@ class AnswerViewer(QtWidgets.QWidget):
         # Message de bienvenue
         self.show_welcome()
 
+    def _web_view(self) -> QWebEngineView:
+        """Vue WebEngine (KaTeX), créée au premier besoin"""
+        if self._web is None:
+            self._web = QWebEngineView()
+            self._stack.addWidget(self._web)
+        return self._web
+
+    def _show_message(self, markdown: str):
+        """Message d'interface : dans la vue WebEngine si elle existe déjà, sinon en texte riche"""
+        if self._web is not None:
+            self.set_answer(markdown)
+            return
+        self._last_markdown = markdown
+        self._last_html = ""
+        self._browser.setMarkdown(markdown)
+
     def show_welcome(self):
         """Afficher un message de bienvenue"""
         welcome_md = """# 🎓 Bienvenue dans l'Assistant Math RAG v3.1
@@ -176,30 +249,31 @@ Posez vos questions sur les mathématiques et je vous aiderai en m'appuyant sur
 
 Exemple : *"Comment résoudre une équation du second degré ?"*
 """
-        self.set_answer(welcome_md)
+        self._show_message(welcome_md)
 
     def show_loading(self):
         """Afficher un message de chargement"""
         loading_md = "# 🔄 Recherche en cours...\n\nVeuillez patienter."
-        self.set_answer(loading_md)
+        self._show_message(loading_md)
 
     def show_error(self, error_msg: str):
         """Afficher un message d'erreur"""
         error_md = f"# ❌ Erreur\n\n{error_msg}"
-        self.set_answer(error_md)
+        self._show_message(error_md)
 
     def set_answer(self, markdown: str):
         """Afficher une réponse en Markdown"""
         self._last_markdown = markdown or ""
         if self._use_katex:
             html_body = markdown_to_html_with_latex(markdown)
-            full_html = KATEX_HTML_TEMPLATE.format(html=html_body)
+            full_html = KATEX_HTML_PREFIX + html_body + KATEX_HTML_SUFFIX
             self._last_html = full_html
-            self.view.setHtml(full_html)
+            web = self._web_view()
+            web.setHtml(full_html)
+            self._stack.setCurrentWidget(web)
         else:
             self._last_html = ""
-            if isinstance(self.view, QtWidgets.QTextBrowser):
-                self.view.setMarkdown(markdown)
+            self._browser.setMarkdown(markdown)
 
     def clear(self):
         """Effacer le contenu"""
@@ -219,9 +293,16 @@ Exemple : *"Comment résoudre une équation du second degré ?"*
         QtWidgets.QApplication.clipboard().setText(self._last_html or "")
 
     def export_html(self, path: str):
-        html = self._last_html or KATEX_HTML_TEMPLATE.format(html=markdown_to_html_with_latex(self._last_markdown))
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(html)
+        html = self._last_html or (
+            KATEX_HTML_PREFIX + markdown_to_html_with_latex(self._last_markdown) + KATEX_HTML_SUFFIX
+        )
+        # Écriture atomique (renommage au commit) d'un seul bloc d'octets UTF-8
+        f = QtCore.QSaveFile(path)
+        if not f.open(QtCore.QIODevice.OpenModeFlag.WriteOnly):
+            raise OSError(f"Impossible d'ouvrir {path} en écriture: {f.errorString()}")
+        f.write(html.encode("utf-8"))
+        if not f.commit():
+            raise OSError(f"Échec de l'export HTML vers {path}: {f.errorString()}")
 
 
 class AnswerToolbar(QtWidgets.QFrame):
@@ -233,8 +314,7 @@ class AnswerToolbar(QtWidgets.QFrame):
         self.viewer = viewer
 
         layout = QtWidgets.QHBoxLayout(self)
-        layout.setContentsMargins(0, 0, 6, 6)
-        layout.setSpacing(8)
+        _apply_layout_style(layout, (0, 0, 6, 6))
 
         self.copy_md_btn = QtWidgets.QPushButton("Copier MD")
         self.copy_html_btn = QtWidgets.QPushButton("Copier HTML")
@@ -273,23 +353,23 @@ class QuickTaskBar(QtWidgets.QFrame):
         super().__init__(parent)
         self.setObjectName("toolbar")
         layout = QtWidgets.QHBoxLayout(self)
-        layout.setContentsMargins(0, 6, 0, 6)
-        layout.setSpacing(6)
+        _apply_layout_style(layout, (0, 6, 0, 6), 6)
 
+        icons = ICONS
         chips = [
-            (f"{ICONS['fiche']} Fiche", "/fiche "),
-            (f"{ICONS['qcm']} QCM", "/qcm "),
-            (f"{ICONS['exam']} Examen", "/exam "),
-            (f"{ICONS['tutor']} Tutor", "/tutor "),
-            (f"{ICONS['formula']} Formule", "/formule "),
-            (f"{ICONS['summary']} Résumé", "/resume "),
-            (f"{ICONS['course']} Cours", "/cours "),
+            (f"{icons['fiche']} Fiche", "/fiche "),
+            (f"{icons['qcm']} QCM", "/qcm "),
+            (f"{icons['exam']} Examen", "/exam "),
+            (f"{icons['tutor']} Tutor", "/tutor "),
+            (f"{icons['formula']} Formule", "/formule "),
+            (f"{icons['summary']} Résumé", "/resume "),
+            (f"{icons['course']} Cours", "/cours "),
         ]
 
         for label, payload in chips:
             btn = QtWidgets.QPushButton(label)
             btn.setProperty("isChip", True)
-            btn.clicked.connect(lambda _, p=payload: self.insert_text.emit(p))
+            btn.clicked.connect(partial(self.insert_text.emit, payload))
             layout.addWidget(btn)
 
         layout.addStretch(1)
@@ -323,24 +403,31 @@ class SourcesTable(QtWidgets.QTableWidget):
         self.setColumnWidth(3, 60)   # Page
 
     def set_sources(self, documents: List[Any]):
-        """Afficher les sources"""
-        self.setRowCount(0)
-
-        for i, doc in enumerate(documents, start=1):
-            self._add_source_row(i, doc)
-
-        self.resizeColumnsToContents()
-
-    def _add_source_row(self, index: int, doc: Any):
-        """Ajouter une ligne pour une source"""
-        row = self.rowCount()
-        self.insertRow(row)
-
+        """
+        Afficher les sources.
+        Mise à jour groupée : repaint et signaux suspendus, lignes préallouées
+        en une fois (les largeurs de colonnes fixées dans __init__ sont conservées).
+        """
+        sorting = self.isSortingEnabled()
+        self.setUpdatesEnabled(False)
+        self.setSortingEnabled(False)
+        self.blockSignals(True)
+        try:
+            self.setRowCount(len(documents))
+            for row, doc in enumerate(documents):
+                self._add_source_row(row, doc)
+        finally:
+            self.blockSignals(False)
+            self.setSortingEnabled(sorting)
+            self.setUpdatesEnabled(True)
+
+    def _add_source_row(self, row: int, doc: Any):
+        """Remplir la ligne (déjà allouée) d'une source"""
         # Extraire les métadonnées
         meta = getattr(doc, 'metadata', {})
 
         # Colonne #
-        self.setItem(row, 0, QtWidgets.QTableWidgetItem(str(index)))
+        self.setItem(row, 0, QtWidgets.QTableWidgetItem(str(row + 1)))
 
         # Colonne Bloc
         block_kind = meta.get('block_kind', '')
@@ -362,9 +449,13 @@ class SourcesTable(QtWidgets.QTableWidget):
 
         # Colonne Aperçu
         content = getattr(doc, 'page_content', '')
-        preview = truncate_text(content.replace('\n', ' '), max_length=140) if content else ''
+        # Une seule tranche bornée (+1 pour savoir s'il faut tronquer), normalisée une fois
+        head = content[:_TOOLTIP_LENGTH + 1]
+        if '\n' in head:
+            head = head.replace('\n', ' ')
+        preview = _truncate(head, _PREVIEW_LENGTH) if head else ''
         preview_item = QtWidgets.QTableWidgetItem(preview)
-        preview_item.setToolTip(truncate_text(content, max_length=500))
+        preview_item.setToolTip(_truncate(head, _TOOLTIP_LENGTH))
         self.setItem(row, 4, preview_item)
 
     def clear(self):
@@ -382,8 +473,7 @@ class ScopeWidget(QtWidgets.QWidget):
         super().__init__(parent)
 
         layout = QtWidgets.QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(8)
+        _apply_layout_style(layout)
 
         # Champs de saisie
         self.chapter_input = QtWidgets.QLineEdit()
@@ -396,13 +486,7 @@ class ScopeWidget(QtWidgets.QWidget):
         self.block_id_input.setPlaceholderText("Block id (ex: 21.52)")
 
         self.type_combo = QtWidgets.QComboBox()
-        self.type_combo.addItems([
-            "(aucun type)",
-            "exercice",
-            "méthode",
-            "théorie",
-            "cours"
-        ])
+        self.type_combo.addItems(("(aucun type)",) + _TYPE_NAMES)
 
         layout.addWidget(self.chapter_input)
         layout.addWidget(self.block_kind_input)
@@ -471,8 +555,7 @@ class OptionsWidget(QtWidgets.QWidget):
         super().__init__(parent)
 
         layout = QtWidgets.QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(8)
+        _apply_layout_style(layout)
 
         self.auto_link_checkbox = QtWidgets.QCheckBox("Auto-link (follow-up)")
         self.auto_link_checkbox.setChecked(True)
@@ -515,18 +598,18 @@ class ActionsWidget(QtWidgets.QWidget):
         super().__init__(parent)
 
         layout = QtWidgets.QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(8)
+        _apply_layout_style(layout)
+        icons = ICONS
 
         # Ligne 1 : Pin / Unpin
         row1 = QtWidgets.QHBoxLayout()
         row1.setSpacing(8)
 
-        self.pin_btn = QtWidgets.QPushButton(f"{ICONS['pin']} Pin")
+        self.pin_btn = QtWidgets.QPushButton(f"{icons['pin']} Pin")
         self.pin_btn.setToolTip("Épingler le contexte actuel")
         self.pin_btn.clicked.connect(self.pin_clicked.emit)
 
-        self.unpin_btn = QtWidgets.QPushButton(f"{ICONS['unpin']} Unpin")
+        self.unpin_btn = QtWidgets.QPushButton(f"{icons['unpin']} Unpin")
         self.unpin_btn.setToolTip("Désépingler le contexte")
         self.unpin_btn.clicked.connect(self.unpin_clicked.emit)
 
@@ -537,11 +620,11 @@ class ActionsWidget(QtWidgets.QWidget):
         row2 = QtWidgets.QHBoxLayout()
         row2.setSpacing(8)
 
-        self.new_chat_btn = QtWidgets.QPushButton(f"{ICONS['new_chat']} New chat")
+        self.new_chat_btn = QtWidgets.QPushButton(f"{icons['new_chat']} New chat")
         self.new_chat_btn.setToolTip("Démarrer un nouveau chat isolé")
         self.new_chat_btn.clicked.connect(self.new_chat_clicked.emit)
 
-        self.forget_btn = QtWidgets.QPushButton(f"{ICONS['forget']} Forget")
+        self.forget_btn = QtWidgets.QPushButton(f"{icons['forget']} Forget")
         self.forget_btn.setToolTip("Oublier la mémoire courte")
         self.forget_btn.clicked.connect(self.forget_clicked.emit)
 
@@ -549,7 +632,7 @@ class ActionsWidget(QtWidgets.QWidget):
         row2.addWidget(self.forget_btn)
 
         # Ligne 3 : Save log
-        self.save_log_btn = QtWidgets.QPushButton(f"{ICONS['save']} Sauver log (JSONL)")
+        self.save_log_btn = QtWidgets.QPushButton(f"{icons['save']} Sauver log (JSONL)")
         self.save_log_btn.setToolTip("Sauvegarder la conversation dans un fichier JSONL")
         self.save_log_btn.clicked.connect(self.save_log_clicked.emit)
 
@@ -575,13 +658,7 @@ class QueryInputWidget(QtWidgets.QHBoxLayout):
 
         # Filtre de type
         self.filter_combo = QtWidgets.QComboBox()
-        self.filter_combo.addItems([
-            "(aucun filtre)",
-            "exercice",
-            "méthode",
-            "théorie",
-            "cours"
-        ])
+        self.filter_combo.addItems(("(aucun filtre)",) + _TYPE_NAMES)
         self.filter_combo.setFixedWidth(140)
         self.filter_combo.setToolTip("Filtrer par type de contenu")
 
@@ -644,8 +721,7 @@ class TaskTabs(QtWidgets.QTabWidget):
         w = QtWidgets.QWidget()
         lay = QtWidgets.QFormLayout(w)
         lay.setLabelAlignment(QtCore.Qt.AlignmentFlag.AlignRight)
-        lay.setContentsMargins(12, 12, 12, 12)
-        lay.setSpacing(10)
+        _apply_layout_style(lay, _FORM_MARGINS, _FORM_SPACING)
         return w, lay
 
     def _submit_btn(self, text="Générer"):
@@ -659,7 +735,7 @@ class TaskTabs(QtWidgets.QTabWidget):
         topic = self._line("Notion (ex: Série entière)")
         level = self._line("Niveau (Prépa, Licence...)")
         gen = self._submit_btn("Générer la fiche")
-        gen.clicked.connect(lambda: self.taskRequested.emit("sheet_create", {"question_or_payload": topic.text().strip(), "level": level.text().strip() or "Prépa"}))
+        gen.clicked.connect(partial(self._emit_fiche, topic, level))
         lay.addRow("Sujet :", topic)
         lay.addRow("Niveau :", level)
         lay.addRow("", gen)
@@ -669,7 +745,7 @@ class TaskTabs(QtWidgets.QTabWidget):
         w, lay = self._form_tab()
         notion = self._line("Notion ciblée")
         gen = self._submit_btn("Générer le QCM")
-        gen.clicked.connect(lambda: self.taskRequested.emit("qcm", {"question_or_payload": notion.text().strip()}))
+        gen.clicked.connect(partial(self._emit_qcm, notion))
         lay.addRow("Notion :", notion)
         lay.addRow("", gen)
         self.addTab(w, f"{ICONS['qcm']} QCM")
@@ -680,15 +756,7 @@ class TaskTabs(QtWidgets.QTabWidget):
         duration = self._line("Durée (ex: 3h)")
         level = self._line("Niveau (ex: Prépa)")
         gen = self._submit_btn("Générer le sujet")
-
-        def _emit():
-            self.taskRequested.emit("exam_gen", {
-                "question_or_payload": f"Exam chapters {chapters.text().strip()}",
-                "chapters": chapters.text().strip(),
-                "duration": duration.text().strip() or "3h",
-                "level": level.text().strip() or "Prépa"
-            })
-        gen.clicked.connect(_emit)
+        gen.clicked.connect(partial(self._emit_exam, chapters, duration, level))
         lay.addRow("Chapitres :", chapters)
         lay.addRow("Durée :", duration)
         lay.addRow("Niveau :", level)
@@ -700,7 +768,7 @@ class TaskTabs(QtWidgets.QTabWidget):
         stmt = QtWidgets.QPlainTextEdit()
         stmt.setPlaceholderText("Énoncé à guider (pas à pas, sans solution)")
         gen = self._submit_btn("Démarrer le tutor")
-        gen.clicked.connect(lambda: self.taskRequested.emit("tutor", {"question_or_payload": stmt.toPlainText().strip(), "with_solutions": False}))
+        gen.clicked.connect(partial(self._emit_tutor, stmt))
         lay.addRow("Énoncé :", stmt)
         lay.addRow("", gen)
         self.addTab(w, f"{ICONS['tutor']} Tutor")
@@ -709,7 +777,7 @@ class TaskTabs(QtWidgets.QTabWidget):
         w, lay = self._form_tab()
         q = self._line("Description (ex: dérivée produit, transformée de Laplace...)")
         gen = self._submit_btn("Rechercher la formule")
-        gen.clicked.connect(lambda: self.taskRequested.emit("formula", {"question_or_payload": q.text().strip()}))
+        gen.clicked.connect(partial(self._emit_formule, q))
         lay.addRow("Recherche :", q)
         lay.addRow("", gen)
         self.addTab(w, f"{ICONS['formula']} Formule")
@@ -718,7 +786,7 @@ class TaskTabs(QtWidgets.QTabWidget):
         w, lay = self._form_tab()
         q = self._line("Notion / partie de cours")
         gen = self._submit_btn("Générer le résumé")
-        gen.clicked.connect(lambda: self.taskRequested.emit("course_summary", {"question_or_payload": q.text().strip()}))
+        gen.clicked.connect(partial(self._emit_resume, q))
         lay.addRow("Sujet :", q)
         lay.addRow("", gen)
         self.addTab(w, f"{ICONS['summary']} Résumé")
@@ -728,12 +796,39 @@ class TaskTabs(QtWidgets.QTabWidget):
         q = self._line("Notion (ex: Séries, EV, DL...)")
         level = self._line("Niveau (Prépa, Licence...)")
         gen = self._submit_btn("Générer le mini-cours")
-        gen.clicked.connect(lambda: self.taskRequested.emit("course_build", {"question_or_payload": q.text().strip(), "level": level.text().strip() or "Prépa"}))
+        gen.clicked.connect(partial(self._emit_cours, q, level))
         lay.addRow("Notion :", q)
         lay.addRow("Niveau :", level)
         lay.addRow("", gen)
         self.addTab(w, f"{ICONS['course']} Cours")
 
+    # --- slots (champs lus au moment du clic) ---
+    def _emit_fiche(self, topic, level):
+        self.taskRequested.emit("sheet_create", {"question_or_payload": topic.text().strip(), "level": level.text().strip() or "Prépa"})
+
+    def _emit_qcm(self, notion):
+        self.taskRequested.emit("qcm", {"question_or_payload": notion.text().strip()})
+
+    def _emit_exam(self, chapters, duration, level):
+        self.taskRequested.emit("exam_gen", {
+            "question_or_payload": f"Exam chapters {chapters.text().strip()}",
+            "chapters": chapters.text().strip(),
+            "duration": duration.text().strip() or "3h",
+            "level": level.text().strip() or "Prépa"
+        })
+
+    def _emit_tutor(self, stmt):
+        self.taskRequested.emit("tutor", {"question_or_payload": stmt.toPlainText().strip(), "with_solutions": False})
+
+    def _emit_formule(self, q):
+        self.taskRequested.emit("formula", {"question_or_payload": q.text().strip()})
+
+    def _emit_resume(self, q):
+        self.taskRequested.emit("course_summary", {"question_or_payload": q.text().strip()})
+
+    def _emit_cours(self, q, level):
+        self.taskRequested.emit("course_build", {"question_or_payload": q.text().strip(), "level": level.text().strip() or "Prépa"})
+
 
 class CommandPalette(QtWidgets.QFrame):
     """
@@ -763,8 +858,7 @@ class CommandPalette(QtWidgets.QFrame):
         self.box.setFixedWidth(720)
 
         v = QtWidgets.QVBoxLayout(self.box)
-        v.setContentsMargins(12, 12, 12, 12)
-        v.setSpacing(8)
+        _apply_layout_style(v, _FORM_MARGINS)
 
         self.input = QtWidgets.QLineEdit()
         self.input.setObjectName("palette_input")
@@ -775,13 +869,25 @@ class CommandPalette(QtWidgets.QFrame):
         v.addWidget(self.input)
         v.addWidget(self.list)
 
-        # Données commandes
+        # Données commandes (items créés une fois, le filtre masque/affiche les lignes)
         self._commands = self._build_commands()
+        for row, cmd in enumerate(self._commands):
+            cmd["_row"] = row
+            cmd["_hay"] = f"{cmd['label']} {cmd['hint']}".lower()
+            cmd["_action"] = self._command_action(cmd["id"])
         self._filtered = self._commands[:]
+        self._last_query = ""  # requête ayant produit _filtered
+        self._populate_list()
         self._refresh_list()
 
+        # Filtre différé : une rafale de frappes ne déclenche qu'une recherche
+        self._search_timer = QtCore.QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(40)
+        self._search_timer.timeout.connect(self._do_search)
+
         # Connexions
-        self.input.textChanged.connect(self._on_search)
+        self.input.textChanged.connect(self._schedule_search)
         self.list.itemActivated.connect(self._on_activate)
         self.list.itemClicked.connect(self._on_activate)
 
@@ -819,7 +925,9 @@ class CommandPalette(QtWidgets.QFrame):
 
     def _reset_search(self):
         self.input.clear()
+        self._search_timer.stop()
         self._filtered = self._commands[:]
+        self._last_query = ""
         self._refresh_list()
 
     # --- commandes disponibles ---
@@ -848,28 +956,54 @@ class CommandPalette(QtWidgets.QFrame):
             {"id": "insert_/cours", "label": "Insérer : /cours ", "hint": "Générer un mini-cours"},
         ]
 
-    def _refresh_list(self):
-        self.list.clear()
-        for cmd in self._filtered:
+    def _populate_list(self):
+        user_role = QtCore.Qt.ItemDataRole.UserRole
+        for cmd in self._commands:
             item = QtWidgets.QListWidgetItem(f"{cmd['label']}  ·  {cmd['hint']}")
-            item.setData(QtCore.Qt.ItemDataRole.UserRole, cmd["id"])
+            item.setData(user_role, cmd["id"])
             self.list.addItem(item)
-        if self.list.count() > 0:
-            self.list.setCurrentRow(0)
+
+    def _refresh_list(self):
+        shown = {cmd["id"] for cmd in self._filtered}
+        lst = self.list
+        # Un seul relayout/repaint pour toute la mise à jour
+        lst.setUpdatesEnabled(False)
+        lst.blockSignals(True)
+        try:
+            for row, cmd in enumerate(self._commands):
+                hidden = cmd["id"] not in shown
+                if lst.isRowHidden(row) != hidden:
+                    lst.setRowHidden(row, hidden)
+        finally:
+            lst.blockSignals(False)
+            lst.setUpdatesEnabled(True)
+        # _filtered suit l'ordre de _commands : sa tête est la première ligne visible.
+        # -1 vide la sélection : Entrée ne doit pas activer une ligne masquée
+        lst.setCurrentRow(self._filtered[0]["_row"] if self._filtered else -1)
+
+    def _schedule_search(self, _text: str):
+        self._search_timer.start()
+
+    def _do_search(self):
+        self._on_search(self.input.text())
 
     def _on_search(self, text: str):
         q = (text or "").strip().lower()
         if not q:
             self._filtered = self._commands[:]
+            self._last_query = ""
             self._refresh_list()
             return
+        # Requête prolongée (frappe en cours) : les résultats sont un sous-ensemble
+        # des précédents, inutile de repartir de toutes les commandes
+        if self._last_query and q.startswith(self._last_query):
+            pool = self._filtered
+        else:
+            pool = self._commands
         # filtre simple (substring sur label/hint)
-        res = []
-        for c in self._commands:
-            hay = f"{c['label']} {c['hint']}".lower()
-            if all(tok in hay for tok in q.split()):
-                res.append(c)
-        self._filtered = res
+        tokens = q.split()
+        self._filtered = [c for c in pool if all(tok in c["_hay"] for tok in tokens)]
+        self._last_query = q
         self._refresh_list()
 
     def keyPressEvent(self, event: QtGui.QKeyEvent) -> None:
@@ -886,24 +1020,28 @@ class CommandPalette(QtWidgets.QFrame):
         super().keyPressEvent(event)
 
     def _activate_current(self):
+        # Appliquer un filtre encore en attente avant de valider
+        if self._search_timer.isActive():
+            self._search_timer.stop()
+            self._do_search()
         item = self.list.currentItem()
         if item:
             self._on_activate(item)
 
-    def _on_activate(self, item: QtWidgets.QListWidgetItem):
-        cmd_id = item.data(QtCore.Qt.ItemDataRole.UserRole)
+    @staticmethod
+    def _command_action(cmd_id: str) -> tuple:
+        """(signal, argument) émis à l'activation, calculé une fois par commande"""
         if cmd_id.startswith("insert_/"):
             # insérer une slash command
-            text = cmd_id.replace("insert_", "") + " "
-            self.insertTextRequested.emit(text)
-            self.hide_palette()
-            return
+            return "insertTextRequested", cmd_id.replace("insert_", "") + " "
         if cmd_id.startswith("goto_"):
             # naviguer vers onglet
-            target = cmd_id.split("_", 1)[1]
-            self.gotoTabRequested.emit(target)
-            self.hide_palette()
-            return
+            return "gotoTabRequested", cmd_id.split("_", 1)[1]
         # déclencher action
-        self.triggerRequested.emit(cmd_id)
+        return "triggerRequested", cmd_id
+
+    def _on_activate(self, item: QtWidgets.QListWidgetItem):
+        # Les items suivent l'ordre de _commands (jamais retirés, seulement masqués)
+        signal, arg = self._commands[self.list.row(item)]["_action"]
+        getattr(self, signal).emit(arg)
         self.hide_palette()
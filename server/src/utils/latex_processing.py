@@ -6,10 +6,13 @@ Normalisation des commandes LaTeX vers Unicode pour améliorer le retrieval.
 
 from __future__ import annotations
 import re
-from typing import Dict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Mapping
 
-# Mapping LaTeX → Unicode (symboles les plus courants)
-LATEX_TO_UNICODE: Dict[str, str] = {
+# Mapping LaTeX → Unicode (symboles les plus courants), une entrée par commande.
+# Lecture seule : la regex compilée plus bas en est dérivée à l'import
+LATEX_TO_UNICODE: Mapping[str, str] = MappingProxyType({
     # Opérateurs calcul différentiel/intégral
     r'\\int': '∫',
     r'\\iint': '∬',
@@ -20,7 +23,6 @@ LATEX_TO_UNICODE: Dict[str, str] = {
     r'\\sqrt': '√',
     r'\\partial': '∂',
     r'\\nabla': '∇',
-    r'\\Delta': 'Δ',
     r'\\infty': '∞',
     
     # Opérateurs arithmétiques
@@ -82,10 +84,8 @@ LATEX_TO_UNICODE: Dict[str, str] = {
     r'\\to': '→',
     r'\\rightarrow': '→',
     r'\\Rightarrow': '⇒',
-    r'\\implies': '⟹',
     r'\\leftrightarrow': '↔',
     r'\\Leftrightarrow': '⇔',
-    r'\\iff': '⟺',
     r'\\mapsto': '↦',
     r'\\longmapsto': '⟼',
     r'\\leftarrow': '←',
@@ -163,8 +163,41 @@ LATEX_TO_UNICODE: Dict[str, str] = {
     r'\\Q': 'ℚ',
     r'\\R': 'ℝ',
     r'\\C': 'ℂ',
+})
+
+
+# Table compilée : clés sans échappement regex (ex: '\\int', '\\mathbb{R}')
+_LATEX_REPL: Dict[str, str] = {
+    re.sub(r'\\(.)', r'\1', cmd): char for cmd, char in LATEX_TO_UNICODE.items()
 }
 
+# Une seule alternance (noms les plus longs d'abord) au lieu d'un re.sub par entrée.
+# Le lookahead évite les faux positifs (ex: \int ne match pas \integer)
+_LATEX_CMD_RE = re.compile(
+    r'\\(?:'
+    + '|'.join(re.escape(cmd[1:]) for cmd in sorted(_LATEX_REPL, key=len, reverse=True))
+    + r')(?![a-zA-Z])'
+)
+
+# Structures complexes (mode aggressive)
+_FRAC_RE = re.compile(r'\\frac\{([^}]+)\}\{([^}]+)\}')
+_SQRT_RE = re.compile(r'\\sqrt\{([^}]+)\}')
+_LIM_SUB_RE = re.compile(r'\\lim_\{([^}]+)\}')
+_LIM_RE = re.compile(r'\\lim')
+_SUBSCRIPT_RE = re.compile(r'_\{([^}]+)\}')
+_SUPERSCRIPT_RE = re.compile(r'\^\{([^}]+)\}')
+_DOLLARS_RE = re.compile(r'\$+')
+_LEFT_RIGHT_RE = re.compile(r'\\left|\\right')
+_FORMAT_CMD_RE = re.compile(r'\\(text|mathrm|mathbf|mathit|mathcal|mathfrak|mathsf|mathtt)\{([^}]+)\}')
+_LATEX_SPACE_RE = re.compile(r'\\[,;:!]|\\quad|\\qquad')
+_CMD_RE = re.compile(r'\\[a-zA-Z]+')  # backslash suivi de lettres
+_CLEANUP_RE = re.compile(r'[{}]|\\[a-zA-Z]+|\\(?![a-zA-Z])')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _cleanup_repl(match: re.Match) -> str:
+    return '' if match.group(0) == '\\' else ' '
+
 
 def normalize_latex_to_unicode(text: str, aggressive: bool = False) -> str:
     """
@@ -190,61 +223,72 @@ def normalize_latex_to_unicode(text: str, aggressive: bool = False) -> str:
     """
     if not text:
         return text
-    
-    # Sauvegarder le texte original pour comparaison
-    original = text
-    
-    # Étape 1: Remplacer les commandes LaTeX par Unicode
-    for latex_cmd, unicode_char in LATEX_TO_UNICODE.items():
-        # Utiliser word boundary pour éviter les faux positifs
-        # (ex: \int ne match pas \integer)
-        pattern = latex_cmd + r'(?![a-zA-Z])'
-        text = re.sub(pattern, unicode_char, text)
+    # Sans backslash (ni $ / accolades en mode aggressive), seule la
+    # normalisation des espaces a un effet : pas de regex LaTeX ni de cache
+    if '\\' not in text and not (aggressive and ('$' in text or '{' in text or '}' in text)):
+        return _WHITESPACE_RE.sub(' ', text).strip()
+    # Les longs documents (indexation) passent hors cache
+    if len(text) > _CACHE_MAX_LEN:
+        return _normalize_latex_to_unicode(text, aggressive)
+    return _normalize_cached(text, aggressive)
+
+
+def _normalize_latex_to_unicode(text: str, aggressive: bool) -> str:
+    """Implémentation non cachée de normalize_latex_to_unicode"""
+    # Étape 1: Remplacer les commandes LaTeX par Unicode (un seul parcours)
+    if '\\' in text:
+        text = _LATEX_CMD_RE.sub(lambda m: _LATEX_REPL[m.group(0)], text)
     
     if aggressive:
         # Étape 2: Traiter les structures complexes
         
         # \frac{a}{b} → (a)/(b)
-        text = re.sub(r'\\frac\{([^}]+)\}\{([^}]+)\}', r'(\1)/(\2)', text)
+        text = _FRAC_RE.sub(r'(\1)/(\2)', text)
         
         # \sqrt{x} → √(x)
-        text = re.sub(r'\\sqrt\{([^}]+)\}', r'√(\1)', text)
+        text = _SQRT_RE.sub(r'√(\1)', text)
         
         # \lim_{x \to a} → lim(x→a)
-        text = re.sub(r'\\lim_\{([^}]+)\}', r'lim(\1)', text)
-        text = re.sub(r'\\lim', 'lim', text)
+        text = _LIM_SUB_RE.sub(r'lim(\1)', text)
+        text = _LIM_RE.sub('lim', text)
         
         # Indices et exposants: x_{i} → x_i, x^{2} → x^2
-        text = re.sub(r'_\{([^}]+)\}', r'_\1', text)
-        text = re.sub(r'\^\{([^}]+)\}', r'^\1', text)
+        text = _SUBSCRIPT_RE.sub(r'_\1', text)
+        text = _SUPERSCRIPT_RE.sub(r'^\1', text)
         
         # Supprimer les délimiteurs $ et $$
-        text = re.sub(r'\$+', ' ', text)
+        text = _DOLLARS_RE.sub(' ', text)
         
         # Supprimer \left, \right
-        text = re.sub(r'\\left|\\right', '', text)
+        text = _LEFT_RIGHT_RE.sub('', text)
         
         # Supprimer les commandes de formatage courantes
-        text = re.sub(r'\\(text|mathrm|mathbf|mathit|mathcal|mathfrak|mathsf|mathtt)\{([^}]+)\}', r'\2', text)
-        
-        # Supprimer les espaces LaTeX
-        text = re.sub(r'\\[,;:!]', ' ', text)
-        text = re.sub(r'\\quad|\\qquad', ' ', text)
+        text = _FORMAT_CMD_RE.sub(r'\2', text)
         
-        # Supprimer les accolades restantes et backslashes isolés
-        text = re.sub(r'[{}]', ' ', text)
-        text = re.sub(r'\\(?![a-zA-Z])', '', text)
+        # Supprimer les espaces LaTeX (\, \; \: \! \quad \qquad) en un seul passage
+        text = _LATEX_SPACE_RE.sub(' ', text)
         
-        # Nettoyer les backslashes restants (commandes non reconnues)
-        text = re.sub(r'\\[a-zA-Z]+', ' ', text)
+        # Accolades restantes et commandes non reconnues → espace,
+        # backslashes isolés supprimés (un seul parcours)
+        text = _CLEANUP_RE.sub(_cleanup_repl, text)
     
     # Étape 3: Normaliser les espaces
-    text = re.sub(r'\s+', ' ', text)
+    text = _WHITESPACE_RE.sub(' ', text)
     text = text.strip()
     
     return text
 
 
+# Cache des textes courts (queries réémises, chunks dupliqués)
+_CACHE_MAX_LEN = 8192
+_normalize_cached = lru_cache(maxsize=4096)(_normalize_latex_to_unicode)
+
+
+def clear_latex_cache() -> None:
+    """Vide le cache de normalize_latex_to_unicode"""
+    _normalize_cached.cache_clear()
+
+
 def extract_latex_commands(text: str) -> set[str]:
     """
     Extrait toutes les commandes LaTeX d'un texte.
@@ -256,13 +300,12 @@ def extract_latex_commands(text: str) -> set[str]:
     Returns:
         Ensemble des commandes trouvées (ex: {'\\int', '\\alpha', '\\frac'})
     """
-    commands = set()
-    
-    # Pattern: backslash suivi de lettres
-    for match in re.finditer(r'\\([a-zA-Z]+)', text):
-        commands.add(f"\\{match.group(1)}")
-    
-    return commands
+    return set(_CMD_RE.findall(text))
+
+
+# Commandes dont la présence suffit à détecter du LaTeX
+_LATEX_HINTS = ('\\frac', '\\int', '\\sum', '\\prod', '\\sqrt',
+                '\\alpha', '\\beta', '\\gamma', '\\mathbb', '\\text')
 
 
 def has_latex(text: str) -> bool:
@@ -279,14 +322,11 @@ def has_latex(text: str) -> bool:
         return False
     
     # Délimiteurs LaTeX
-    if re.search(r'\$+', text):
-        return True
-    
-    # Commandes LaTeX courantes
-    if re.search(r'\\(frac|int|sum|prod|sqrt|alpha|beta|gamma|mathbb|text)', text):
+    if '$' in text:
         return True
     
-    return False
+    # Commandes LaTeX courantes (recherche de sous-chaînes, sans moteur regex)
+    return '\\' in text and any(cmd in text for cmd in _LATEX_HINTS)
 
 
 def normalize_query_for_retrieval(query: str) -> str:
@@ -324,6 +364,7 @@ def normalize_document_for_indexing(document: str) -> str:
 # Export des fonctions principales
 __all__ = [
     'normalize_latex_to_unicode',
+    'clear_latex_cache',
     'normalize_query_for_retrieval',
     'normalize_document_for_indexing',
     'extract_latex_commands',
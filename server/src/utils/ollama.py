@@ -7,10 +7,33 @@ Utilitaires pour interagir avec Ollama (local et cloud)
 from __future__ import annotations
 import json
 import difflib
-from urllib.request import Request, urlopen
-from urllib.error import URLError, HTTPError
+import heapq
+import os
+from collections import defaultdict
+import re
+import http.client
+import ssl
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
 from typing import Optional, List, Dict, Any, Tuple
 
+# Suggestions de modèles : rapidfuzz (C++) si disponible, sinon difflib
+try:
+    from rapidfuzz import process as fuzz_process, fuzz
+except ImportError:
+    fuzz_process = None
+
+# Décodeur JSON C si disponible (orjson), sinon module standard
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 
 def build_url(host: str, path: str) -> str:
     """
@@ -43,6 +66,92 @@ def add_authorization_header(headers: Dict[str, str], host: str, api_key: Option
     return headers
 
 
+# Connexions keep-alive inactives par (schéma, hôte) : la poignée de main TLS
+# du Cloud n'est payée qu'une fois, et des requêtes concurrentes restent possibles
+_CONN_POOL: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+_CONN_LOCK = threading.Lock()
+
+
+def _new_connection(scheme: str, netloc: str, timeout: float) -> http.client.HTTPConnection:
+    if scheme == 'https':
+        return http.client.HTTPSConnection(netloc, timeout=timeout, context=ssl.create_default_context())
+    return http.client.HTTPConnection(netloc, timeout=timeout)
+
+
+def _proxy_for(scheme: str, hostname: Optional[str]) -> Optional[str]:
+    """Proxy applicable (variables HTTP(S)_PROXY / NO_PROXY), ou None"""
+    proxy = urllib.request.getproxies().get(scheme)
+    if proxy and hostname and urllib.request.proxy_bypass(hostname):
+        return None
+    return proxy
+
+
+def _http_get_via_proxy(url: str, proxy: str, headers: Dict[str, str], timeout: float) -> Tuple[int, str, bytes]:
+    """GET au travers d'un proxy, via urllib (pas de réutilisation de connexion)"""
+    scheme = urlsplit(url).scheme
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({scheme: proxy}))
+    try:
+        with opener.open(urllib.request.Request(url, headers=headers), timeout=timeout) as resp:
+            return resp.status, resp.reason, resp.read()
+    except HTTPError as e:
+        return e.code, str(e.reason), b''
+
+
+def _http_get(url: str, headers: Dict[str, str], timeout: float) -> Tuple[int, str, bytes]:
+    """
+    Effectue un GET en réutilisant une connexion inactive de l'hôte.
+    Si un proxy est configuré pour l'hôte, la requête passe par urllib.
+    
+    Returns:
+        Tuple (status, reason, corps) ; les redirections ne sont pas suivies
+    
+    Raises:
+        OSError, http.client.HTTPException: En cas d'échec réseau
+    """
+    parts = urlsplit(url)
+    proxy = _proxy_for(parts.scheme, parts.hostname)
+    if proxy:
+        return _http_get_via_proxy(url, proxy, headers, timeout)
+
+    key = (parts.scheme, parts.netloc)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    
+    for attempt in (0, 1):
+        with _CONN_LOCK:
+            idle = _CONN_POOL.get(key)
+            conn = idle.pop() if idle else None
+        reused = conn is not None
+        if conn is None:
+            conn = _new_connection(parts.scheme, parts.netloc, timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            conn.request('GET', path, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            # Une connexion réutilisée a pu être fermée par le serveur : un seul nouvel essai
+            if not reused or attempt:
+                raise
+            continue
+        if resp.will_close:
+            conn.close()
+        else:
+            with _CONN_LOCK:
+                _CONN_POOL.setdefault(key, []).append(conn)
+        return resp.status, resp.reason, body
+
+
+# Cache de /api/tags par (hôte, clé API) : évite les allers-retours réseau répétés
+_MODELS_TTL = 30.0
+_MODELS_CACHE: Dict[Tuple[str, Optional[str]], Tuple[float, List[str]]] = {}
+_MODELS_LOCK = threading.Lock()
+
+
 def list_models(host: str, api_key: Optional[str] = None, timeout: int = 10) -> List[str]:
     """
     Retourne la liste des modèles visibles par l'hôte Ollama (local ou Cloud).
@@ -61,19 +170,46 @@ def list_models(host: str, api_key: Optional[str] = None, timeout: int = 10) ->
     
     Raises:
         RuntimeError: En cas d'échec de la requête
+    
+    Note:
+        Le résultat est mis en cache pendant 30 s (clear_models_cache() pour vider).
     """
-    url = build_url(host, '/api/tags')
-    headers = add_authorization_header({}, host, api_key)
+    key = (host, api_key)
+    cached = _MODELS_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[0] < _MODELS_TTL:
+        return list(cached[1])
+    return _refresh_models(host, api_key, timeout)
+
+
+def _refresh_models(host: str, api_key: Optional[str], timeout: int) -> List[str]:
+    """Interroge /api/tags et met à jour le cache de list_models"""
+    out = _fetch_models(host, api_key, timeout)
+    with _MODELS_LOCK:
+        _MODELS_CACHE[(host, api_key)] = (time.monotonic(), out)
+    return list(out)
+
 
-    req = Request(url, headers=headers, method='GET')
+def clear_models_cache() -> None:
+    """Vide le cache de list_models"""
+    with _MODELS_LOCK:
+        _MODELS_CACHE.clear()
+
+
+def _fetch_models(host: str, api_key: Optional[str], timeout: int) -> List[str]:
+    """Interroge /api/tags (sans cache)"""
+    # Équivalent inline de build_url / add_authorization_header
+    url = host.rstrip('/') + '/api/tags'
+    headers = {'Authorization': f'Bearer {api_key}'} if api_key and host.startswith('https://ollama.com') else {}
+
+    try:
+        status, reason, body = _http_get(url, headers, timeout)
+    except (http.client.HTTPException, OSError) as e:
+        raise RuntimeError(f"Échec de /api/tags: {e}") from e
+    if not 200 <= status < 300:
+        raise RuntimeError(f"Échec de /api/tags (code {status}): {reason}")
     
     try:
-        with urlopen(req, timeout=timeout) as resp:
-            data = json.load(resp)
-    except HTTPError as e:
-        raise RuntimeError(f"Échec de /api/tags (code {e.code}): {e.reason}") from e
-    except URLError as e:
-        raise RuntimeError(f"Échec de /api/tags: {e.reason}") from e
+        data = _json_loads(body)
     except json.JSONDecodeError as e:
         raise RuntimeError(f"Réponse JSON invalide de /api/tags: {e}") from e
 
@@ -124,8 +260,14 @@ def ensure_model_or_exit(host: str, model: str, api_key: Optional[str] = None) -
     if ok:
         return
     
-    # Suggestions proches (Levenshtein approximée via difflib)
-    suggestions = difflib.get_close_matches(model, list(models), n=5, cutoff=0.4)
+    # Suggestions proches (similarité de Levenshtein)
+    if fuzz_process is not None:
+        suggestions = [
+            name for name, _, _ in
+            fuzz_process.extract(model, models, scorer=fuzz.WRatio, limit=5, score_cutoff=40)
+        ]
+    else:
+        suggestions = difflib.get_close_matches(model, list(models), n=5, cutoff=0.4)
     
     msg = [
         f"❌ Le modèle '{model}' n'est pas disponible sur {host}.",
@@ -133,8 +275,8 @@ def ensure_model_or_exit(host: str, model: str, api_key: Optional[str] = None) -
         "📋 Modèles détectés (extrait):"
     ]
     
-    # Afficher les 15 premiers modèles triés
-    for m in sorted(list(models))[:15]:
+    # Afficher les 15 premiers modèles triés (tri partiel)
+    for m in heapq.nsmallest(15, models):
         msg.append(f"   • {m}")
     
     if len(models) > 15:
@@ -153,6 +295,9 @@ def ensure_model_or_exit(host: str, model: str, api_key: Optional[str] = None) -
     raise SystemExit("\n".join(msg))
 
 
+_PROMPT_CACHE: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
 def load_prompt(prompt_file: str) -> str:
     """
     Charge le contenu d'un fichier de prompt.
@@ -168,12 +313,21 @@ def load_prompt(prompt_file: str) -> str:
         IOError: En cas d'erreur de lecture
     """
     try:
+        st = os.stat(prompt_file)
+        # Contenu en cache tant que le fichier n'a pas changé (mtime + taille)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = _PROMPT_CACHE.get(prompt_file)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
         with open(prompt_file, 'r', encoding='utf-8') as f:
-            return f.read()
+            content = f.read()
     except FileNotFoundError:
         raise FileNotFoundError(f"Fichier de prompt introuvable: {prompt_file}")
     except Exception as e:
         raise IOError(f"Erreur lors de la lecture du prompt: {e}") from e
+    
+    _PROMPT_CACHE[prompt_file] = (stamp, content)
+    return content
 
 
 def check_ollama_health(host: str, timeout: int = 5) -> Dict[str, Any]:
@@ -200,31 +354,41 @@ def check_ollama_health(host: str, timeout: int = 5) -> Dict[str, Any]:
         "error": None
     }
     
-    try:
-        # Tenter de lister les modèles comme test de santé
-        models = list_models(host, timeout=timeout)
-        result["healthy"] = True
-        result["models_count"] = len(models)
-        
-        # Optionnel: récupérer la version (si endpoint disponible)
+    # Les deux requêtes partent en parallèle : latence = max des deux, pas la somme
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # Requête réelle (pas le cache de 30 s) : le serveur a pu tomber entre-temps
+        f_models = executor.submit(_refresh_models, host, None, timeout)
+        f_version = executor.submit(_fetch_version, host, timeout)
         try:
-            version_url = build_url(host, '/api/version')
-            req = Request(version_url, method='GET')
-            with urlopen(req, timeout=timeout) as resp:
-                version_data = json.load(resp)
-                result["version"] = version_data.get("version")
-        except Exception:
-            # Version endpoint peut ne pas exister sur toutes les versions
-            pass
-            
-    except RuntimeError as e:
-        result["error"] = str(e)
-    except Exception as e:
-        result["error"] = f"Erreur inattendue: {e}"
+            # Lister les modèles sert de test de santé
+            models = f_models.result()
+            result["healthy"] = True
+            result["models_count"] = len(models)
+            result["version"] = f_version.result()
+        except RuntimeError as e:
+            result["error"] = str(e)
+        except Exception as e:
+            result["error"] = f"Erreur inattendue: {e}"
     
     return result
 
 
+def _fetch_version(host: str, timeout: int) -> Optional[str]:
+    """Version de l'instance Ollama, ou None si l'endpoint est indisponible"""
+    try:
+        status, _, body = _http_get(host.rstrip('/') + '/api/version', {}, timeout)
+        if 200 <= status < 300:
+            return _json_loads(body).get("version")
+    except Exception:
+        # Version endpoint peut ne pas exister sur toutes les versions
+        pass
+    return None
+
+
+# Taille dans un tag de modèle (ex: "7b", "1.5b", "270m")
+_SIZE_RE = re.compile(r'(\d+(?:\.\d+)?[bkm])')
+
+
 def format_model_info(model_name: str, detailed: bool = False) -> str:
     """
     Formate les informations d'un modèle pour affichage.
@@ -246,11 +410,9 @@ def format_model_info(model_name: str, detailed: bool = False) -> str:
     
     # Extraire la taille si présente dans le tag (ex: "7b", "13b")
     size = None
-    if any(c.isdigit() for c in tag):
-        import re
-        size_match = re.search(r'(\d+(?:\.\d+)?[bkm])', tag.lower())
-        if size_match:
-            size = size_match.group(1).upper()
+    size_match = _SIZE_RE.search(tag.lower())
+    if size_match:
+        size = size_match.group(1).upper()
     
     info_parts = [f"📦 {base_name}"]
     if tag != "latest":
@@ -272,18 +434,13 @@ def get_model_families(models: List[str]) -> Dict[str, List[str]]:
         Dictionnaire {famille: [tags]}
         Ex: {"llama2": ["7b", "13b", "70b"], ...}
     """
-    families: Dict[str, List[str]] = {}
+    families: Dict[str, List[str]] = defaultdict(list)
     
     for model in models:
-        parts = model.split(':')
-        base_name = parts[0]
-        tag = parts[1] if len(parts) > 1 else "latest"
-        
-        if base_name not in families:
-            families[base_name] = []
-        families[base_name].append(tag)
-    
-    return families
+        base_name, sep, rest = model.partition(':')
+        families[base_name].append(rest.partition(':')[0] if sep else "latest")
+    
+    return dict(families)
 
 
 # Alias pour compatibilité avec l'ancien lib.py
@@ -6,10 +6,68 @@ Utilitaires pour le traitement de texte, LaTeX, Markdown
 
 from __future__ import annotations
 import re
+import unicodedata
+from functools import lru_cache
 from typing import List, Tuple, Optional, Dict, Any
 from html import escape as html_escape_builtin
 
 
+# Patterns compilés une fois à l'import
+_RE_MULTI_SPACE = re.compile(r' +')
+_RE_MULTI_NL = re.compile(r'\n{3,}')
+# Fin de ligne (au sens de str.splitlines) et blancs qui l'entourent
+_RE_LINE_TRIM = re.compile(
+    r'[^\S\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]*'
+    r'(?:\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029])'
+    r'[^\S\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]*'
+)
+
+# Délimiteurs LaTeX en une seule alternance ($$...$$ et \[...\] multi-lignes) ;
+# le nom du groupe capturé donne le type de formule
+_RE_LATEX_ALL = re.compile(
+    r'(?s:\$\$(?P<dd>.*?)\$\$)'
+    r'|(?s:\\\[(?P<brk>.*?)\\\])'
+    r'|\\\((?P<par>.*?)\\\)'
+    r'|(?<!\$)\$(?!\$)(?P<dol>.*?)(?<!\$)\$(?!\$)'
+)
+_LATEX_KIND = {'dd': 'display', 'brk': 'display', 'par': 'inline', 'dol': 'inline'}
+
+# Type de bloc Markdown d'une ligne (déjà strippée) ; m.lastgroup donne le type
+_RE_BLOCK = re.compile(
+    r'```(?P<fence>.*)'
+    r'|(?P<level>#{1,4}) (?P<header>.*)'
+    r'|[-*] (?P<ul>.*)'
+    r'|[1-9]\.\s+(?P<ol>.*)'
+    r'|> (?P<quote>.*)'
+    r'|(?P<hr>---|\*\*\*|___)$'
+    r'|(?P<empty>)$'
+)
+
+# Éléments inline Markdown en une seule alternance (code, gras, italique, liens)
+_RE_INLINE_MD = re.compile(
+    r'`(?P<code>[^`]+)`'
+    r'|\*\*(?P<b1>[^*]+)\*\*'
+    r'|__(?P<b2>[^_]+)__'
+    r'|\*(?P<i1>[^*]+)\*'
+    r'|_(?P<i2>[^_]+)_'
+    r'|\[(?P<lt>[^\]]+)\]\((?P<lh>[^)]+)\)'
+)
+
+# Citations [p.123], [p. 123] ou [page 123]
+_RE_CITATION = re.compile(r'\[(?:p\.?\s*|page\s+)(\d+)\]', re.IGNORECASE)
+
+_RE_WHITESPACE = re.compile(r'[\s\u00a0\u2000-\u200b]+')
+
+# Mots fréquents pour detect_language
+_RE_FR_WORDS = re.compile(r'\b(?:le|la|les|de|et|un|une|des|est|dans)\b')
+_RE_EN_WORDS = re.compile(r'\b(?:the|is|and|of|a|in|to|that|it|for)\b')
+
+# Abréviations courantes (p. = page)
+_RE_ABBR = re.compile(r'\b(M|Mme|Dr|p|vol)\.')
+_ABBR_RESTORE = str.maketrans({'§': '.'})
+_RE_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-ZÉÈÊÀÂ])')
+
+
 def clean_text(text: str) -> str:
     """
     Nettoie un texte en normalisant les espaces et sauts de ligne.
@@ -21,11 +79,11 @@ def clean_text(text: str) -> str:
         Texte nettoyé
     """
     # Remplacer les multiples espaces par un seul
-    text = re.sub(r' +', ' ', text)
+    text = _RE_MULTI_SPACE.sub(' ', text)
     # Remplacer les multiples sauts de ligne par maximum 2
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = _RE_MULTI_NL.sub('\n\n', text)
     # Supprimer les espaces en début/fin de ligne
-    text = '\n'.join(line.strip() for line in text.splitlines())
+    text = _RE_LINE_TRIM.sub('\n', text)
     return text.strip()
 
 
@@ -40,28 +98,14 @@ def extract_latex_formulas(text: str) -> List[Tuple[str, str, int, int]]:
         Liste de tuples (type, formula, start_pos, end_pos)
         où type est 'display' ($$...$$) ou 'inline' ($...$)
     """
-    formulas = []
-    
-    # Display math: $$...$$
-    for match in re.finditer(r'\$\$(.*?)\$\$', text, re.DOTALL):
-        formulas.append(('display', match.group(1).strip(), match.start(), match.end()))
-    
-    # Inline math: $...$
-    for match in re.finditer(r'(?<!\$)\$(?!\$)(.*?)(?<!\$)\$(?!\$)', text):
-        formulas.append(('inline', match.group(1).strip(), match.start(), match.end()))
-    
-    # LaTeX delimiters: \[...\] et \(...\)
-    for match in re.finditer(r'\\\[(.*?)\\\]', text, re.DOTALL):
-        formulas.append(('display', match.group(1).strip(), match.start(), match.end()))
-    
-    for match in re.finditer(r'\\\((.*?)\\\)', text):
-        formulas.append(('inline', match.group(1).strip(), match.start(), match.end()))
-    
-    # Trier par position
-    return sorted(formulas, key=lambda x: x[2])
+    # Un seul parcours : résultats déjà ordonnés et sans chevauchement
+    return [
+        (_LATEX_KIND[m.lastgroup], m[m.lastgroup].strip(), *m.span())
+        for m in _RE_LATEX_ALL.finditer(text)
+    ]
 
 
-def escape_latex_in_text(text: str, placeholder: str = "LATEX_FORMULA_{}") -> Tuple[str, Dict[str, str]]:
+def escape_latex_in_text(text: str, placeholder: str = "LATEX_FORMULA_{}") -> Tuple[str, Dict[str, Tuple[str, str]]]:
     """
     Remplace les formules LaTeX par des placeholders pour traitement séparé.
     
@@ -74,14 +118,19 @@ def escape_latex_in_text(text: str, placeholder: str = "LATEX_FORMULA_{}") -> Tu
     """
     formulas = extract_latex_formulas(text)
     replacements = {}
-    
-    # Remplacer de la fin vers le début pour conserver les positions
-    for i, (ftype, formula, start, end) in enumerate(reversed(formulas)):
-        key = placeholder.format(len(formulas) - i - 1)
+    parts = []
+    cursor = 0
+    
+    # Un seul parcours dans l'ordre du texte, assemblé par join
+    for i, (ftype, formula, start, end) in enumerate(formulas):
+        key = placeholder.format(i)
+        parts.append(text[cursor:start])
+        parts.append(key)
         replacements[key] = (ftype, formula)
-        text = text[:start] + key + text[end:]
+        cursor = end
+    parts.append(text[cursor:])
     
-    return text, replacements
+    return ''.join(parts), replacements
 
 
 def restore_latex_formulas(text: str, replacements: Dict[str, Tuple[str, str]]) -> str:
@@ -95,12 +144,22 @@ def restore_latex_formulas(text: str, replacements: Dict[str, Tuple[str, str]])
     Returns:
         Texte avec LaTeX restauré
     """
-    for placeholder, (ftype, formula) in replacements.items():
+    if not replacements:
+        return text
+    
+    # Une seule substitution ; clés les plus longues d'abord dans l'alternance
+    # (LATEX_FORMULA_10 avant LATEX_FORMULA_1)
+    pattern = re.compile('|'.join(
+        re.escape(key) for key in sorted(replacements, key=len, reverse=True)
+    ))
+    
+    def _sub(match: re.Match) -> str:
+        ftype, formula = replacements[match.group(0)]
         if ftype == 'display':
-            text = text.replace(placeholder, f"$${formula}$$")
-        else:
-            text = text.replace(placeholder, f"${formula}$")
-    return text
+            return f"$${formula}$$"
+        return f"${formula}$"
+    
+    return pattern.sub(_sub, text)
 
 
 def markdown_to_html(markdown: str, preserve_latex: bool = True) -> str:
@@ -115,106 +174,104 @@ def markdown_to_html(markdown: str, preserve_latex: bool = True) -> str:
     Returns:
         HTML généré
     """
-    if preserve_latex:
+    # Les longs documents passent hors cache
+    if len(markdown) > _MD_CACHE_MAX_LEN:
+        return _markdown_to_html(markdown, preserve_latex)
+    return _markdown_to_html_cached(markdown, preserve_latex)
+
+
+def _markdown_to_html(markdown: str, preserve_latex: bool) -> str:
+    """Conversion effective (sans cache)"""
+    # Sans délimiteur $, \[ ou \( il n'y a aucune formule à protéger
+    if preserve_latex and ('$' in markdown or '\\[' in markdown or '\\(' in markdown):
         # Temporairement remplacer le LaTeX
         text, latex_map = escape_latex_in_text(markdown)
     else:
         text = markdown
         latex_map = {}
     
-    lines = text.splitlines()
     html_lines = []
+    emit = html_lines.append  # sortie accumulée, jointe une seule fois
     in_code_block = False
-    in_list = False
-    code_lang = ""
+    list_kind = None  # 'ul' / 'ol' quand une liste est ouverte
     
-    for line in lines:
+    for line in text.splitlines():
         stripped = line.strip()
+        m = _RE_BLOCK.match(stripped)
+        kind = m.lastgroup if m else None
         
         # Code blocks
-        if stripped.startswith('```'):
+        if kind == 'fence':
             if in_code_block:
-                html_lines.append('</code></pre>')
+                emit('</code></pre>')
                 in_code_block = False
             else:
-                code_lang = stripped[3:].strip()
+                code_lang = m.group('fence').strip()
                 lang_class = f' class="language-{code_lang}"' if code_lang else ''
-                html_lines.append(f'<pre><code{lang_class}>')
+                emit(f'<pre><code{lang_class}>')
                 in_code_block = True
             continue
         
         if in_code_block:
-            html_lines.append(html_escape_builtin(line))
+            emit(html_escape_builtin(line))
             continue
         
         # Headers
-        if stripped.startswith('# '):
-            html_lines.append(f'<h1>{html_escape_builtin(stripped[2:])}</h1>')
-        elif stripped.startswith('## '):
-            html_lines.append(f'<h2>{html_escape_builtin(stripped[3:])}</h2>')
-        elif stripped.startswith('### '):
-            html_lines.append(f'<h3>{html_escape_builtin(stripped[4:])}</h3>')
-        elif stripped.startswith('#### '):
-            html_lines.append(f'<h4>{html_escape_builtin(stripped[5:])}</h4>')
+        if kind == 'header':
+            level = len(m.group('level'))
+            emit(f'<h{level}>{html_escape_builtin(m.group(kind))}</h{level}>')
         
         # Lists
-        elif stripped.startswith('- ') or stripped.startswith('* '):
-            if not in_list:
-                html_lines.append('<ul>')
-                in_list = True
-            html_lines.append(f'<li>{html_escape_builtin(stripped[2:])}</li>')
-        
-        elif stripped.startswith(tuple(f'{i}. ' for i in range(1, 10))):
-            if not in_list:
-                html_lines.append('<ol>')
-                in_list = True
-            content = re.sub(r'^\d+\.\s+', '', stripped)
-            html_lines.append(f'<li>{html_escape_builtin(content)}</li>')
+        elif kind == 'ul' or kind == 'ol':
+            if list_kind is None:
+                emit(f'<{kind}>')
+                list_kind = kind
+            emit(f'<li>{html_escape_builtin(m.group(kind))}</li>')
         
         # Blockquotes
-        elif stripped.startswith('> '):
-            content = stripped[2:]
-            html_lines.append(f'<blockquote>{html_escape_builtin(content)}</blockquote>')
+        elif kind == 'quote':
+            emit(f'<blockquote>{html_escape_builtin(m.group(kind))}</blockquote>')
         
-        # Horizontal rule
-        elif stripped in ('---', '***', '___'):
-            if in_list:
-                html_lines.append('</ul>' if html_lines[-2].startswith('<ul>') else '</ol>')
-                in_list = False
-            html_lines.append('<hr>')
-        
-        # Empty line
-        elif not stripped:
-            if in_list:
-                html_lines.append('</ul>' if '<ul>' in '\n'.join(html_lines[-5:]) else '</ol>')
-                in_list = False
-            html_lines.append('<br>')
-        
-        # Paragraph
         else:
-            if in_list:
-                html_lines.append('</ul>' if '<ul>' in '\n'.join(html_lines[-5:]) else '</ol>')
-                in_list = False
+            # Horizontal rule, ligne vide ou paragraphe : fermer la liste
+            if list_kind is not None:
+                emit(f'</{list_kind}>')
+                list_kind = None
             
-            # Inline formatting
-            formatted = format_inline_markdown(stripped)
-            html_lines.append(f'<p>{formatted}</p>')
+            if kind == 'hr':
+                emit('<hr>')
+            elif kind == 'empty':
+                emit('<br>')
+            else:
+                # Inline formatting
+                formatted = format_inline_markdown(stripped)
+                emit(f'<p>{formatted}</p>')
     
     # Close any open tags
     if in_code_block:
-        html_lines.append('</code></pre>')
-    if in_list:
-        html_lines.append('</ul>')
+        emit('</code></pre>')
+    if list_kind is not None:
+        emit(f'</{list_kind}>')
     
     html = '\n'.join(html_lines)
     
     # Restaurer le LaTeX
-    if preserve_latex:
+    if latex_map:
         html = restore_latex_formulas(html, latex_map)
     
     return html
 
 
+# Cache des messages courts (réponses réaffichées, messages d'état)
+_MD_CACHE_MAX_LEN = 64_000
+_markdown_to_html_cached = lru_cache(maxsize=256)(_markdown_to_html)
+
+
+def clear_markdown_cache() -> None:
+    """Vide le cache de markdown_to_html"""
+    _markdown_to_html_cached.cache_clear()
+
+
 def format_inline_markdown(text: str) -> str:
     """
     Formate les éléments inline Markdown (gras, italique, code, liens).
@@ -225,21 +282,26 @@ def format_inline_markdown(text: str) -> str:
     Returns:
         HTML avec formatage inline
     """
-    # Code inline
-    text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
-    
-    # Bold
-    text = re.sub(r'\*\*([^\*]+)\*\*', r'<strong>\1</strong>', text)
-    text = re.sub(r'__([^_]+)__', r'<strong>\1</strong>', text)
-    
-    # Italic
-    text = re.sub(r'\*([^\*]+)\*', r'<em>\1</em>', text)
-    text = re.sub(r'_([^_]+)_', r'<em>\1</em>', text)
-    
-    # Links
-    text = re.sub(r'\[([^\]]+)\]\(([^\)]+)\)', r'<a href="\2">\1</a>', text)
+    parts = []
+    cursor = 0
+    
+    # Un seul parcours ; seul le texte hors balises générées est échappé
+    for m in _RE_INLINE_MD.finditer(text):
+        parts.append(html_escape_builtin(text[cursor:m.start()]))
+        kind = m.lastgroup
+        if kind == 'code':
+            parts.append(f'<code>{html_escape_builtin(m.group(kind))}</code>')
+        elif kind == 'b1' or kind == 'b2':
+            parts.append(f'<strong>{format_inline_markdown(m.group(kind))}</strong>')
+        elif kind == 'i1' or kind == 'i2':
+            parts.append(f'<em>{format_inline_markdown(m.group(kind))}</em>')
+        else:
+            href = html_escape_builtin(m.group('lh'))
+            parts.append(f'<a href="{href}">{format_inline_markdown(m.group("lt"))}</a>')
+        cursor = m.end()
+    parts.append(html_escape_builtin(text[cursor:]))
     
-    return html_escape_builtin(text).replace('&lt;', '<').replace('&gt;', '>')
+    return ''.join(parts)
 
 
 def wrap_latex_display(formula: str) -> str:
@@ -290,17 +352,7 @@ def extract_citations(text: str) -> List[Tuple[str, int]]:
     Returns:
         Liste de tuples (citation_complète, numéro_page)
     """
-    citations = []
-    
-    # Pattern [p.123] ou [p. 123]
-    for match in re.finditer(r'\[p\.?\s*(\d+)\]', text, re.IGNORECASE):
-        citations.append((match.group(0), int(match.group(1))))
-    
-    # Pattern [page 123]
-    for match in re.finditer(r'\[page\s+(\d+)\]', text, re.IGNORECASE):
-        citations.append((match.group(0), int(match.group(1))))
-    
-    return citations
+    return [(match.group(0), int(match.group(1))) for match in _RE_CITATION.finditer(text)]
 
 
 def truncate_text(text: str, max_length: int = 200, suffix: str = "…") -> str:
@@ -318,14 +370,13 @@ def truncate_text(text: str, max_length: int = 200, suffix: str = "…") -> str:
     if len(text) <= max_length:
         return text
     
-    # Tronquer à max_length puis trouver le dernier espace
-    truncated = text[:max_length]
-    last_space = truncated.rfind(' ')
+    # Dernier espace avant max_length, cherché sans copier le texte
+    last_space = text.rfind(' ', 0, max_length)
     
-    if last_space > max_length * 0.8:  # Au moins 80% de la longueur cible
-        truncated = truncated[:last_space]
+    # Couper au mot si l'on garde au moins 80% de la longueur cible
+    cut = last_space if last_space > max_length * 0.8 else max_length
     
-    return truncated.rstrip('.,;:!?') + suffix
+    return text[:cut].rstrip('.,;:!?') + suffix
 
 
 def normalize_whitespace(text: str) -> str:
@@ -338,12 +389,29 @@ def normalize_whitespace(text: str) -> str:
     Returns:
         Texte normalisé
     """
+    # Texte ASCII : split()/join suffit, sans passer par le moteur regex
+    if text.isascii():
+        return ' '.join(text.split())
+    
     # Remplacer tous les types d'espaces par des espaces normaux
-    text = re.sub(r'[\s\u00a0\u2000-\u200b]+', ' ', text)
+    text = _RE_WHITESPACE.sub(' ', text)
     # Supprimer les espaces en début/fin
     return text.strip()
 
 
+def strip_accents(text: str) -> str:
+    """
+    Retire les accents (décomposition NFKD, casse conservée).
+    
+    Args:
+        text: Texte à désaccentuer
+    
+    Returns:
+        Texte ASCII (caractères non décomposables supprimés)
+    """
+    return unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+
+
 def detect_language(text: str) -> str:
     """
     Détecte la langue d'un texte (français/anglais de base).
@@ -356,13 +424,9 @@ def detect_language(text: str) -> str:
     """
     text_lower = text.lower()
     
-    # Mots français fréquents
-    fr_words = ['le', 'la', 'les', 'de', 'et', 'un', 'une', 'des', 'est', 'dans']
-    # Mots anglais fréquents
-    en_words = ['the', 'is', 'and', 'of', 'a', 'in', 'to', 'that', 'it', 'for']
-    
-    fr_count = sum(1 for w in fr_words if f' {w} ' in f' {text_lower} ')
-    en_count = sum(1 for w in en_words if f' {w} ' in f' {text_lower} ')
+    # Nombre d'occurrences des mots fréquents de chaque langue
+    fr_count = len(_RE_FR_WORDS.findall(text_lower))
+    en_count = len(_RE_EN_WORDS.findall(text_lower))
     
     if fr_count > en_count:
         return 'fr'
@@ -383,19 +447,12 @@ def split_into_sentences(text: str) -> List[str]:
         Liste de phrases
     """
     # Remplacer les abréviations courantes pour éviter les faux positifs
-    text = re.sub(r'\bM\.', 'M§', text)
-    text = re.sub(r'\bMme\.', 'Mme§', text)
-    text = re.sub(r'\bDr\.', 'Dr§', text)
-    text = re.sub(r'\bp\.', 'p§', text)  # page
-    text = re.sub(r'\bvol\.', 'vol§', text)
-    
-    # Découper sur . ! ? suivi d'espace et majuscule
-    sentences = re.split(r'(?<=[.!?])\s+(?=[A-ZÉÈÊÀÂ])', text)
+    text = _RE_ABBR.sub(r'\1§', text)
     
-    # Restaurer les abréviations
-    sentences = [s.replace('§', '.') for s in sentences]
+    # Découper sur . ! ? suivi d'espace et majuscule, puis restaurer les abréviations
+    sentences = (s.translate(_ABBR_RESTORE).strip() for s in _RE_SENTENCE_SPLIT.split(text))
     
-    return [s.strip() for s in sentences if s.strip()]
+    return [s for s in sentences if s]
 
 
 def highlight_keywords(text: str, keywords: List[str], tag: str = 'mark') -> str:
@@ -410,17 +467,20 @@ def highlight_keywords(text: str, keywords: List[str], tag: str = 'mark') -> str
     Returns:
         Texte avec mots-clés surlignés
     """
-    for kw in keywords:
-        # Échapper le mot-clé pour regex
-        pattern = re.escape(kw)
-        # Surligner (case insensitive)
-        text = re.sub(
-            f'({pattern})',
-            f'<{tag}>\\1</{tag}>',
-            text,
-            flags=re.IGNORECASE
-        )
-    return text
+    keys = tuple(sorted({kw for kw in keywords if kw}))
+    if not keys:
+        return text
+    
+    return _highlight_pattern(keys).sub(lambda m: f'<{tag}>{m.group(0)}</{tag}>', text)
+
+
+@lru_cache(maxsize=64)
+def _highlight_pattern(keys: Tuple[str, ...]) -> re.Pattern:
+    """Alternance compilée des mots-clés (plus longs d'abord, insensible à la casse)"""
+    return re.compile(
+        '|'.join(sorted(map(re.escape, keys), key=len, reverse=True)),
+        re.IGNORECASE,
+    )
 
 
 # Alias pour compatibilité
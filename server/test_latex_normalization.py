@@ -10,6 +10,9 @@ from src.utils.latex_processing import (
     extract_latex_commands,
 )
 
+# Symboles Unicode attendus après normalisation
+UNICODE_MATH = frozenset("∫∑αβγℝℕℤ∈")
+
 def test_basic_normalization():
     """Test des conversions de base"""
     print("🧪 Test 1: Conversions de base")
@@ -29,7 +32,7 @@ def test_basic_normalization():
         result = normalize_query_for_retrieval(input_text)
         print(f"  '{input_text}'")
         print(f"  → '{result}'")
-        if expected_contains in result or any(c in result for c in expected_contains):
+        if expected_contains in result or not set(expected_contains).isdisjoint(result):
             print("  ✅ OK")
         else:
             print(f"  ❌ FAIL (attendu: contient '{expected_contains}')")
@@ -99,7 +102,7 @@ def test_comparison():
         
         # Vérifier qu'ils partagent maintenant des symboles communs
         common_symbols = set(latex_normalized) & set(text_form)
-        if any(c in "∫∑αβγℝℕℤ∈" for c in latex_normalized):
+        if not UNICODE_MATH.isdisjoint(latex_normalized):
             print("  ✅ Symboles Unicode présents")
         else:
             print("  ⚠️  Peu de symboles Unicode")
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Tests du dispatch des commandes de MathCLI (assistant simulé)
+"""
+
+import importlib
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture
+def cli(monkeypatch):
+    """MathCLI dont chaque handler _cmd_* enregistre (handler, commande)"""
+    memory = types.SimpleNamespace(chat_id="test", state={})
+    assistant = types.ModuleType("src.assistant")
+    assistant.get_assistant = lambda: types.SimpleNamespace(memory=memory)
+    monkeypatch.setitem(sys.modules, "src.assistant", assistant)
+    for name in ("src.ui.cli", "src.ui.cli.app"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    app = importlib.import_module("src.ui.cli.app")
+
+    calls = []
+    for attr in dir(app.MathCLI):
+        if attr.startswith("_cmd_"):
+            def _record(self, cmd, _attr=attr):
+                calls.append((_attr, cmd))
+                return True
+            monkeypatch.setattr(app.MathCLI, attr, _record)
+
+    instance = app.MathCLI()
+    instance.calls = calls
+    return instance
+
+
+@pytest.mark.parametrize("command, handler", [
+    ("/pin", "_cmd_pin"),
+    ("/reset", "_cmd_reset"),
+    ("/models", "_cmd_models"),
+    ("/model", "_cmd_models"),
+    ("  /where  ", "_cmd_where"),
+])
+def test_exact_commands(cli, command, handler):
+    assert cli.handle_command(command) is True
+    assert cli.calls == [(handler, command.strip())]
+
+
+@pytest.mark.parametrize("command, handler", [
+    ("/help", "_cmd_help"),
+    ("/HELP", "_cmd_help"),
+    ("/Aide", "_cmd_help"),
+    ("/Show", "_cmd_show"),
+    ("/MAN qcm", "_cmd_man"),
+])
+def test_case_insensitive_commands(cli, command, handler):
+    assert cli.handle_command(command) is True
+    assert cli.calls == [(handler, command)]
+
+
+def test_other_commands_are_case_sensitive(cli):
+    assert cli.handle_command("/PIN") is False
+    assert cli.calls == []
+
+
+@pytest.mark.parametrize("command, handler", [
+    ("/qcm suites numériques", "_cmd_qcm"),
+    ("/find-bloc Théorème 2.3", "_cmd_find_bloc"),
+    ("/ch 4", "_cmd_ch"),
+])
+def test_required_argument(cli, command, handler):
+    assert cli.handle_command(command) is True
+    assert cli.calls == [(handler, command)]
+
+
+@pytest.mark.parametrize("command", ["/qcm", "/ch", "/man", "/type"])
+def test_missing_required_argument_is_not_a_command(cli, command):
+    assert cli.handle_command(command) is False
+    assert cli.calls == []
+
+
+@pytest.mark.parametrize("command, handler", [
+    ("/scope", "_cmd_scope"),
+    ("/scope show", "_cmd_scope"),
+    ("/tutor", "_cmd_tutor"),
+    ("/tutor strict", "_cmd_tutor"),
+    ("/route", "_cmd_router"),
+    ("/runtime local", "_cmd_backend"),
+])
+def test_optional_argument(cli, command, handler):
+    assert cli.handle_command(command) is True
+    assert cli.calls == [(handler, command)]
+
+
+@pytest.mark.parametrize("command", [
+    "/pin maintenant",   # commande sans argument suivie d'un argument
+    "/blocksx",          # plus de correspondance par simple préfixe
+    "/qcmx suites",
+    "/exercice",         # filtre rapide : laissé à handle_question
+])
+def test_unmatched_commands_fall_through(cli, command):
+    assert cli.handle_command(command) is False
+    assert cli.calls == []
+
+
+def test_meta_question_is_handled(cli):
+    assert cli.handle_command("De quoi on parlait ?") is True
+    assert cli.calls == []
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de src/utils/ollama.py : connexions keep-alive, proxy et codes HTTP
+"""
+
+import http.client
+import urllib.request
+
+import pytest
+
+from src.utils import ollama
+
+
+class _FakeResponse:
+    def __init__(self, status=200, reason="OK", body=b'{"models": []}', will_close=False):
+        self.status = status
+        self.reason = reason
+        self.will_close = will_close
+        self._body = body
+
+    def read(self):
+        return self._body
+
+
+class _FakeConnection:
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.sock = None
+        self.timeout = None
+        self.closed = False
+        self.requests = []
+
+    def request(self, method, path, headers=None):
+        self.requests.append((method, path))
+        if self.error is not None:
+            raise self.error
+
+    def getresponse(self):
+        return self.response
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch):
+    """Pool et cache vides, aucun proxy hérité de l'environnement"""
+    monkeypatch.setattr(urllib.request, "getproxies", lambda: {})
+    ollama._CONN_POOL.clear()
+    ollama.clear_models_cache()
+    yield
+    ollama._CONN_POOL.clear()
+    ollama.clear_models_cache()
+
+
+def test_stale_pooled_connection_is_retried_once(monkeypatch):
+    stale = _FakeConnection(error=http.client.RemoteDisconnected("closed"))
+    fresh = _FakeConnection(_FakeResponse(body=b'{"models": [{"name": "qwen:7b"}]}'))
+    ollama._CONN_POOL[("http", "localhost:11434")] = [stale]
+    monkeypatch.setattr(ollama, "_new_connection", lambda scheme, netloc, timeout: fresh)
+
+    assert ollama.list_models("http://localhost:11434") == ["qwen:7b"]
+    assert stale.closed
+    assert fresh.requests == [("GET", "/api/tags")]
+    # La nouvelle connexion retourne dans le pool
+    assert ollama._CONN_POOL[("http", "localhost:11434")] == [fresh]
+
+
+def test_fresh_connection_failure_is_not_retried(monkeypatch):
+    created = []
+
+    def _new(scheme, netloc, timeout):
+        conn = _FakeConnection(error=ConnectionRefusedError("refused"))
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(ollama, "_new_connection", _new)
+    with pytest.raises(RuntimeError, match="Échec de /api/tags"):
+        ollama.list_models("http://localhost:11434")
+    assert len(created) == 1
+
+
+@pytest.mark.parametrize("status, reason", [
+    (302, "Found"),
+    (401, "Unauthorized"),
+    (500, "Internal Server Error"),
+])
+def test_non_2xx_status_is_reported_as_http_error(monkeypatch, status, reason):
+    monkeypatch.setattr(ollama, "_http_get", lambda url, headers, timeout: (status, reason, b"<html></html>"))
+    with pytest.raises(RuntimeError, match=rf"Échec de /api/tags \(code {status}\): {reason}"):
+        ollama.list_models("http://localhost:11434")
+
+
+def test_proxy_from_environment_is_honoured(monkeypatch):
+    monkeypatch.setattr(urllib.request, "getproxies", lambda: {"https": "http://proxy.local:3128"})
+    monkeypatch.setattr(urllib.request, "proxy_bypass", lambda host: False)
+    calls = []
+
+    def _via_proxy(url, proxy, headers, timeout):
+        calls.append((url, proxy))
+        return 200, "OK", b'{"models": [{"model": "llama3"}]}'
+
+    monkeypatch.setattr(ollama, "_http_get_via_proxy", _via_proxy)
+    monkeypatch.setattr(ollama, "_new_connection", lambda *a: pytest.fail("connexion directe inattendue"))
+
+    assert ollama.list_models("https://ollama.com", api_key="k") == ["llama3"]
+    assert calls == [("https://ollama.com/api/tags", "http://proxy.local:3128")]
+
+
+def test_no_proxy_bypass_uses_direct_connection(monkeypatch):
+    monkeypatch.setattr(urllib.request, "getproxies", lambda: {"http": "http://proxy.local:3128"})
+    monkeypatch.setattr(urllib.request, "proxy_bypass", lambda host: host == "localhost")
+    conn = _FakeConnection(_FakeResponse())
+    monkeypatch.setattr(ollama, "_new_connection", lambda scheme, netloc, timeout: conn)
+
+    assert ollama.list_models("http://localhost:11434") == []
+    assert conn.requests == [("GET", "/api/tags")]
+
+
+def test_health_check_bypasses_models_cache(monkeypatch):
+    responses = {"/api/tags": (200, "OK", b'{"models": [{"name": "qwen:7b"}]}'),
+                 "/api/version": (200, "OK", b'{"version": "0.5.0"}')}
+    monkeypatch.setattr(ollama, "_http_get",
+                        lambda url, headers, timeout: responses[url[url.index("/api/"):]])
+    assert ollama.list_models("http://localhost:11434") == ["qwen:7b"]
+
+    # Serveur tombé : list_models sert encore le cache, pas le test de santé
+    responses["/api/tags"] = (503, "Service Unavailable", b"")
+    assert ollama.list_models("http://localhost:11434") == ["qwen:7b"]
+    health = ollama.check_ollama_health("http://localhost:11434")
+    assert not health["healthy"]
+    assert "code 503" in health["error"]
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de src/core/rag_engine.py (dépendances langchain / torch simulées)
+"""
+
+import importlib
+import sys
+import types
+
+import pytest
+
+
+class _Document:
+    def __init__(self, page_content="", metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class _BM25Retriever:
+    builds = []
+
+    @classmethod
+    def from_documents(cls, docs, k):
+        cls.builds.append([d.page_content for d in docs])
+        retriever = cls()
+        retriever.docs = docs
+        return retriever
+
+
+def _stub(monkeypatch, name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    monkeypatch.setitem(sys.modules, name, module)
+    return module
+
+
+@pytest.fixture
+def rag_engine(monkeypatch):
+    """Importe rag_engine avec des modules langchain factices"""
+    _stub(monkeypatch, "langchain_core")
+    _stub(monkeypatch, "langchain_core.documents", Document=_Document)
+    _stub(monkeypatch, "langchain_text_splitters", RecursiveCharacterTextSplitter=object)
+    _stub(monkeypatch, "langchain_chroma", Chroma=object)
+    _stub(monkeypatch, "langchain_ollama")
+    _stub(monkeypatch, "langchain_ollama.embeddings", OllamaEmbeddings=object)
+    _stub(monkeypatch, "langchain_community")
+    _stub(monkeypatch, "langchain_community.retrievers", BM25Retriever=_BM25Retriever)
+    monkeypatch.delitem(sys.modules, "src.core.rag_engine", raising=False)
+    module = importlib.import_module("src.core.rag_engine")
+    module._load_cross_encoder.cache_clear()
+    monkeypatch.setattr(module.rag_config, "use_reranker", False)
+    _BM25Retriever.builds = []
+    yield module
+    module._load_cross_encoder.cache_clear()
+
+
+@pytest.fixture
+def cross_encoder_env(monkeypatch):
+    """sentence_transformers / torch factices ; renvoie la liste des quantifications"""
+    quantized = []
+
+    class _Param:
+        def __init__(self, device_type):
+            self.device = types.SimpleNamespace(type=device_type)
+
+    class _Model:
+        def __init__(self, device_type):
+            self.device_type = device_type
+
+        def parameters(self):
+            return iter([_Param(self.device_type)])
+
+    class _CrossEncoder:
+        # Device choisi par sentence-transformers quand aucun n'est imposé
+        auto_device = "cpu"
+
+        def __init__(self, hf_id, device=None):
+            self.model = _Model(device or self.auto_device)
+
+    def _quantize_dynamic(model, layers, dtype):
+        quantized.append(model.device_type)
+        return model
+
+    torch = _stub(monkeypatch, "torch", qint8="qint8")
+    torch.nn = types.SimpleNamespace(Linear=object)
+    torch.ao = types.SimpleNamespace(
+        quantization=types.SimpleNamespace(quantize_dynamic=_quantize_dynamic)
+    )
+    _stub(monkeypatch, "sentence_transformers", CrossEncoder=_CrossEncoder)
+    return _CrossEncoder, quantized
+
+
+@pytest.mark.parametrize("device, auto_device, expected", [
+    (None, "cpu", ["cpu"]),
+    (None, "cuda", []),      # RERANKER_DEVICE absent mais GPU disponible
+    ("cpu", "cuda", ["cpu"]),
+    ("cuda", "cpu", []),
+])
+def test_int8_quantization_only_on_cpu_model(rag_engine, cross_encoder_env, device, auto_device, expected):
+    cross_encoder_cls, quantized = cross_encoder_env
+    cross_encoder_cls.auto_device = auto_device
+
+    rag_engine._load_cross_encoder("reranker", device, True)
+    assert quantized == expected
+
+
+def test_no_quantization_without_int8(rag_engine, cross_encoder_env):
+    _, quantized = cross_encoder_env
+    rag_engine._load_cross_encoder("reranker", None, False)
+    assert quantized == []
+
+
+def test_bm25_index_shared_per_filters_and_single_corpus(rag_engine):
+    corpus = [_Document("théorème de Pythagore", {"type": "cours"}),
+              _Document("exercice intégrale", {"type": "exercice"})]
+
+    def retriever(docs, filters):
+        return rag_engine.HybridRetriever(None, docs, k=8, filters=filters, use_reranker=False)
+
+    first = retriever(corpus, {"type": "Cours"})
+    # Filtres équivalents (casse/accents) : index réutilisé
+    assert retriever(corpus, {"type": "cours"}).bm25 is first.bm25
+    assert _BM25Retriever.builds == [["theoreme de Pythagore"]]
+
+    # Nouveau corpus (réindexation) : l'ancien n'est plus retenu par le cache
+    reindexed = [_Document("lemme de Gauss", {"type": "cours"})]
+    assert retriever(reindexed, {"type": "cours"}).bm25 is not first.bm25
+    assert rag_engine._bm25_corpus is reindexed
+    assert len(rag_engine._BM25_CACHE) == 1
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de src/utils/text_processing.py
+"""
+
+import pytest
+
+from src.utils import (
+    detect_language,
+    escape_latex_in_text,
+    restore_latex_formulas,
+    markdown_to_html,
+    format_inline_markdown,
+    extract_citations,
+)
+
+
+def test_detect_language_counts_occurrences():
+    assert detect_language("le théorème et la preuve de la propriété") == 'fr'
+    assert detect_language("the theorem and the proof of the property") == 'en'
+    assert detect_language("x = 2") == 'unknown'
+
+
+def test_detect_language_scans_whole_text():
+    # Long préambule anglais puis un corps français majoritaire
+    text = "the proof " * 500 + "la preuve de la propriété et le lemme " * 600
+    assert detect_language(text) == 'fr'
+
+
+def test_escape_and_restore_latex_roundtrip():
+    text = "".join(f"$x_{{{i}}}$ " for i in range(12)) + "$$\\int f$$"
+    escaped, replacements = escape_latex_in_text(text)
+    assert '$' not in escaped
+    assert "LATEX_FORMULA_1 " in escaped and "LATEX_FORMULA_10 " in escaped
+    assert restore_latex_formulas(escaped, replacements) == text
+
+
+def test_markdown_to_html_closes_lists_and_blocks():
+    md = "- a\n- b\ntexte\n1. un\n\n# T\n```py\nx<1\n"
+    assert markdown_to_html(md, preserve_latex=False) == (
+        '<ul>\n<li>a</li>\n<li>b</li>\n</ul>\n'
+        '<p>texte</p>\n'
+        '<ol>\n<li>un</li>\n</ol>\n'
+        '<br>\n'
+        '<h1>T</h1>\n'
+        '<pre><code class="language-py">\nx&lt;1\n</code></pre>'
+    )
+
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("a < b & c > d", "a &lt; b &amp; c &gt; d"),
+    ("<script>x</script>", "&lt;script&gt;x&lt;/script&gt;"),
+    ("**x<y**", "<strong>x&lt;y</strong>"),
+    ("`a<b>`", "<code>a&lt;b&gt;</code>"),
+    ("*i* et _j_ et __k__", "<em>i</em> et <em>j</em> et <strong>k</strong>"),
+    ("[lien](http://e.com/?a=1&b=2)", '<a href="http://e.com/?a=1&amp;b=2">lien</a>'),
+])
+def test_format_inline_markdown_escapes_text(text, expected):
+    assert format_inline_markdown(text) == expected
+
+
+def test_extract_citations_single_pass_keeps_text_order():
+    text = "voir [p. 12], [P.3] et [page 7], [Page  8] puis [p.12] ; [pages 4] ignoré"
+    assert extract_citations(text) == [
+        ("[p. 12]", 12), ("[P.3]", 3), ("[page 7]", 7), ("[Page  8]", 8), ("[p.12]", 12),
+    ]